@@ -1,52 +1,71 @@
+import json
+import sys
 import matplotlib.pyplot as plt
 import numpy as np
 
-# Data
-operations = [
-    "Search by ID",
-    "Search by Key-Value Pair",
-    "Search within a Range",
-    "Calculate Percentile",
-    "Update Value"
-]
-
-average_response_times = [0.02211019992828369, 0.023590428829193114, 0.0003346061706542969, 0.022787318229675294, 0.04352011442184448]
-standard_deviations = [0.01898577041036138, 0.02197730034645888, 0.00017766412759579332, 0.02081288973158473, 0.027855735653561694]
+# Plots a JSON report from benchmark_suite.py (latency against inventory size) or benchmark.py (one bar per operation)
+# Usage: python Graph.py [report.json] [output.png]
+report_path = sys.argv[1] if len(sys.argv) > 1 else 'benchmark_results.json'
+with open(report_path) as report_file:
+    report = json.load(report_file)
 
-# Set the width of the bars
-bar_width = 0.35
-
-# Create an array of indices for the x-axis
-x = np.arange(len(operations))
+# Data
+operation_labels = {
+    "searchByID": "Search by ID",
+    "search": "Search by Key-Value Pair",
+    "searchRange": "Search within a Range",
+    "getDistribution": "Calculate Percentile",
+    "update": "Update Value"
+}
 
-# Create subplots
-fig, ax = plt.subplots()
+if 'results' in report:
+    # Scaling report: p50 and p99 latency of each operation against the number of rows
+    fig, ax = plt.subplots()
+    sizes = [result['rows'] for result in report['results']]
+    for (method, label), color in zip(operation_labels.items(), plt.rcParams['axes.prop_cycle'].by_key()['color']):
+        p50 = [result['methods'].get(method, {}).get('p50_ms', np.nan) for result in report['results']]
+        p99 = [result['methods'].get(method, {}).get('p99_ms', np.nan) for result in report['results']]
+        ax.plot(sizes, p50, marker='o', color=color, label=f'{label} (p50)')
+        ax.plot(sizes, p99, marker='x', linestyle='--', color=color, alpha=0.6, label=f'{label} (p99)')
 
-# Plot average response times
-bar1 = ax.bar(x - bar_width/2, average_response_times, bar_width, color='b', alpha=0.5, label='Average Response Time')
+    ax.set_xscale('log')
+    ax.set_yscale('log')
+    ax.set_xlabel('Inventory size (rows)')
+    ax.set_ylabel('Latency (ms)')
+    ax.legend(loc='upper left', fontsize=8)
+    plt.title('Response Time by Inventory Size')
+else:
+    # Load-test report: p50 and p99 latency per operation
+    methods = [method for method in operation_labels if method in report['methods']]
+    p50 = [report['methods'][method]['p50_ms'] for method in methods]
+    p99 = [report['methods'][method]['p99_ms'] for method in methods]
 
-# Plot standard deviations
-bar2 = ax.bar(x + bar_width/2, standard_deviations, bar_width, color='r', alpha=0.5, label='Standard Deviation')
+    # Set the width of the bars
+    bar_width = 0.35
 
-# Set the y-axis label
-ax.set_ylabel('Time (seconds)')
-ax.set_xlabel('Operations')
+    # Create an array of indices for the x-axis
+    x = np.arange(len(methods))
 
-# Set the x-axis ticks and labels
-ax.set_xticks(x)
-ax.set_xticklabels(operations, rotation=15)
+    fig, ax = plt.subplots()
+    bar1 = ax.bar(x - bar_width/2, p50, bar_width, color='b', alpha=0.5, label='p50 Response Time')
+    bar2 = ax.bar(x + bar_width/2, p99, bar_width, color='r', alpha=0.5, label='p99 Response Time')
 
-# Add a legend
-ax.legend(loc='upper left')
+    ax.set_ylabel('Time (ms)')
+    ax.set_xlabel('Operations')
+    ax.set_xticks(x)
+    ax.set_xticklabels([operation_labels[method] for method in methods], rotation=15)
+    ax.legend(loc='upper left')
 
-# Add text annotations on top of the bars
-for bar, data in zip(bar1 + bar2, average_response_times + standard_deviations):
-    ax.annotate(f'{data:.4f}', xy=(bar.get_x() + bar.get_width() / 2, data), xytext=(0, 3),
-                textcoords='offset points', ha='center', fontsize=9)
+    # Add text annotations on top of the bars
+    for bar, data in zip(bar1 + bar2, p50 + p99):
+        ax.annotate(f'{data:.2f}', xy=(bar.get_x() + bar.get_width() / 2, data), xytext=(0, 3),
+                    textcoords='offset points', ha='center', fontsize=9)
 
-# Title
-plt.title('Average Response Time and Standard Deviation for Different Operations')
+    plt.title(f"Response Time per Operation ({report['throughput_rps']:.0f} requests/s)")
 
-# Display the plot
+# Display the plot, or save it when given a file name
 plt.tight_layout()
-plt.show()
\ No newline at end of file
+if len(sys.argv) > 2:
+    plt.savefig(sys.argv[2])
+else:
+    plt.show()
@@ -0,0 +1,115 @@
+import numpy as np
+import inventory_pb2
+from query_planner import query_value
+
+# The aggregate RPC's arithmetic. Rows are numbered by group once. Each summarized column is then sorted
+# once by (group, value), so every group's values form one run: min, max and percentiles are read off
+# the ends and interior of that run, while counts, sums and histogram buckets come from np.bincount
+# over the group numbers. The work is a handful of NumPy calls per column however many groups there are.
+
+
+def check_request(request, store):
+    # Raises ValueError for anything the request gets wrong
+    for column in request.columns:
+        if column not in store:
+            raise ValueError(f"Unknown column '{column}'.")
+        if not store.is_numeric(column):
+            raise ValueError(f"Column '{column}' is not numeric.")
+    if request.group_by and request.group_by not in store:
+        raise ValueError(f"Unknown column '{request.group_by}'.")
+    for percentile in request.percentiles:
+        if not 0 <= percentile <= 100:
+            raise ValueError(f"Percentile {percentile} is outside 0-100.")
+    if request.histogram_buckets < 0:
+        raise ValueError(f"Histogram buckets must not be negative, got {request.histogram_buckets}.")
+
+
+def group_rows(store, column, rows):
+    # (group number per row, each group's value). Groups are in sort_key order with the missing values last;
+    # without a column every row is in one group.
+    if not column:
+        return np.zeros(len(rows), dtype=np.int64), [None]
+    data, valid = store.cells(column, rows)
+    if store.is_numeric(column):
+        valid = valid & ~np.isnan(data)
+        keys = data[valid]
+    else:
+        ranks, _ = store.sort_ranks(column)
+        keys = ranks[data[valid]]
+    _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    groups = np.full(len(rows), len(first), dtype=np.int64)
+    groups[valid] = inverse
+    values = store.values_at(column, rows[valid][first])
+    if not valid.all():
+        values.append(None)
+    return groups, values
+
+
+def summarize(store, column, rows, groups, group_count, percentiles, buckets):
+    # ColumnSummary messages for column, one per group, and the column's Histogram (None without buckets or
+    # values). Statistics of a group with no values are NaN.
+    values, valid = store.cells(column, rows)
+    values = values.astype(np.float64)
+    valid = valid & ~np.isnan(values)
+    values, groups = values[valid], groups[valid]
+    order = np.lexsort((values, groups))
+    values, groups = values[order], groups[order]
+
+    counts = np.bincount(groups, minlength=group_count)
+    sums = np.bincount(groups, weights=values, minlength=group_count)
+    ends = np.cumsum(counts)
+    starts = ends - counts
+    present = counts > 0
+    minimums = np.full(group_count, np.nan)
+    maximums = np.full(group_count, np.nan)
+    means = np.full(group_count, np.nan)
+    minimums[present] = values[starts[present]]
+    maximums[present] = values[ends[present] - 1]
+    means[present] = sums[present] / counts[present]
+
+    # Linear interpolation between closest ranks, as numpy.percentile does, within each group's run
+    percentile_values = []
+    for percentile in percentiles:
+        rank = (counts[present] - 1) * percentile / 100.0
+        low = np.floor(rank).astype(np.int64)
+        high = np.minimum(low + 1, counts[present] - 1)
+        low_values = values[starts[present] + low]
+        high_values = values[starts[present] + high]
+        result = np.full(group_count, np.nan)
+        result[present] = low_values + (high_values - low_values) * (rank - low)
+        percentile_values.append(result)
+
+    histogram = None
+    bucket_counts = [[]] * group_count
+    if buckets and len(values):
+        edges = np.linspace(values.min(), values.max(), buckets + 1)
+        bucket = np.clip(np.searchsorted(edges, values, side='right') - 1, 0, buckets - 1)
+        bucket_counts = np.bincount(groups * buckets + bucket, minlength=group_count * buckets)
+        bucket_counts = bucket_counts.reshape(group_count, buckets).tolist()
+        histogram = inventory_pb2.Histogram(column=column, edges=edges.tolist())
+
+    per_group = zip(counts.tolist(), sums.tolist(), minimums.tolist(), maximums.tolist(), means.tolist(),
+                  zip(*[result.tolist() for result in percentile_values]) if percentiles else [[]] * group_count,
+                  bucket_counts)
+    return [inventory_pb2.ColumnSummary(column=column, count=count, sum=total, min=minimum, max=maximum, mean=mean,
+                                        percentiles=group_percentiles, histogram=group_buckets)
+            for count, total, minimum, maximum, mean, group_percentiles, group_buckets in per_group], histogram
+
+
+def aggregate(store, rows, request):
+    # The AggregateResponse for rows, which must already satisfy request.where
+    groups, keys = group_rows(store, request.group_by, rows)
+    group_count = len(keys)
+    row_counts = np.bincount(groups, minlength=group_count).tolist()
+    summaries = []
+    histograms = []
+    for column in request.columns:
+        column_summaries, histogram = summarize(store, column, rows, groups, group_count, list(request.percentiles),
+                                                request.histogram_buckets)
+        summaries.append(column_summaries)
+        if histogram is not None:
+            histograms.append(histogram)
+    return inventory_pb2.AggregateResponse(groups=[
+        inventory_pb2.AggregateGroup(key=query_value(key), rows=row_counts[group],
+                                     columns=[column_summaries[group] for column_summaries in summaries])
+        for group, key in enumerate(keys)], histograms=histograms)
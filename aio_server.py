@@ -0,0 +1,118 @@
+import asyncio
+import itertools
+import signal
+import grpc
+import inventory_pb2
+import inventory_pb2_grpc
+from server import InventoryServiceServicer, SHUTDOWN_GRACE, SERVER_OPTIONS, STREAM_CHUNK_SIZE
+from metrics import AsyncMetricsInterceptor
+from compression import AsyncCompressionInterceptor
+
+
+async def in_thread(iterator, messages=STREAM_CHUNK_SIZE):
+    # A servicer stream, advanced in a worker thread that many messages at a time. Its read lock can block
+    # while an update waits for the write lock, and its vectorized work takes a while, neither of which may
+    # happen on the event loop.
+    while True:
+        items = await asyncio.to_thread(list, itertools.islice(iterator, messages))
+        if not items:
+            return
+        for item in items:
+            yield item
+
+
+class AsyncInventoryServiceServicer(inventory_pb2_grpc.InventoryServiceServicer):
+    # grpc.aio front end over the regular servicer, so both modes share one data store and set of indexes.
+    # Every call into the servicer runs in a worker thread: even an index lookup takes the read lock, which
+    # waits whenever an update is waiting for the write lock, and would stall every connection on the loop.
+
+    def __init__(self, servicer):
+        self.servicer = servicer
+
+    async def searchByID(self, request, context):
+        return await asyncio.to_thread(self.servicer.searchByID, request, context)
+
+    async def search(self, request, context):
+        return await asyncio.to_thread(self.servicer.search, request, context)
+
+    async def searchRange(self, request, context):
+        # Each yield waits for the transport, so other RPCs run while a long stream drains
+        async for record in in_thread(self.servicer.searchRange(request, context)):
+            yield record
+
+    async def query(self, request, context):
+        async for result in in_thread(self.servicer.query(request, context)):
+            yield result
+
+    async def aggregate(self, request, context):
+        return await asyncio.to_thread(self.servicer.aggregate, request, context)
+
+    async def searchRangeBatches(self, request, context):
+        # Batches and export chunks are big enough to fetch one at a time
+        async for records in in_thread(self.servicer.searchRangeBatches(request, context), 1):
+            yield records
+
+    async def export(self, request, context):
+        async for chunk in in_thread(self.servicer.export(request, context), 1):
+            yield chunk
+
+    async def getDistribution(self, request, context):
+        return await asyncio.to_thread(self.servicer.getDistribution, request, context)
+
+    async def update(self, request, context):
+        return await asyncio.to_thread(self.servicer.update, request, context)
+
+    async def batchSearchByID(self, request, context):
+        return await asyncio.to_thread(self.servicer.batchSearchByID, request, context)
+
+    async def bulkUpdate(self, request, context):
+        return await asyncio.to_thread(self.servicer.bulkUpdate, request, context)
+
+    async def searchByIDStream(self, request_iterator, context):
+        async for request in request_iterator:
+            yield await asyncio.to_thread(self.servicer.lookup_result, request)
+
+    async def getStats(self, request, context):
+        return await asyncio.to_thread(self.servicer.getStats, request, context)
+
+    async def watchChanges(self, request, context):
+        # As the servicer's watchChanges, but woken from the updating thread instead of polling a queue
+        loop = asyncio.get_running_loop()
+        published = asyncio.Event()
+        subscription = self.servicer.change_feed.subscribe(lambda: loop.call_soon_threadsafe(published.set))
+        try:
+            yield inventory_pb2.ChangeEvent(sequence=subscription.start)
+            while True:
+                published.clear()
+                while (event := subscription.get(0)) is not None:
+                    sequence, inventory_ids, column = event
+                    yield inventory_pb2.ChangeEvent(sequence=sequence, inventory_ids=inventory_ids, column=column)
+                if subscription.dropped:
+                    await context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED,
+                                        "Fell too far behind the change feed; subscribe again.")
+                await published.wait()
+        finally:
+            self.servicer.change_feed.unsubscribe(subscription)
+
+
+async def serve_aio(excel_file_path='InventoryData.xlsx', port=50051, method_compression=None):
+    inventory_service = InventoryServiceServicer(excel_file_path)
+    server = grpc.aio.server(interceptors=[AsyncMetricsInterceptor(inventory_service.metrics),
+                                           AsyncCompressionInterceptor(method_compression or {})],
+                             options=SERVER_OPTIONS)
+    inventory_pb2_grpc.add_InventoryServiceServicer_to_server(AsyncInventoryServiceServicer(inventory_service), server)
+    server.add_insecure_port(f'[::]:{port}')  # Bind to the port on all interfaces
+    await server.start()
+    print("gRPC asyncio Server is running ............ \n")
+
+    # Stop cleanly on SIGTERM as well as Ctrl+C so pending updates reach the workbook
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, lambda: asyncio.ensure_future(server.stop(SHUTDOWN_GRACE)))
+    await server.wait_for_termination()
+    inventory_service.close()
+    print("gRPC asyncio Server terminated !!!")
+
+
+if __name__ == "__main__":
+    asyncio.run(serve_aio())
@@ -0,0 +1,223 @@
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import threading
+from time import perf_counter, sleep
+from types import SimpleNamespace
+import grpc
+import numpy as np
+import inventory_pb2
+from client import requestResponseData
+from inventory_client import ChannelPool, query
+
+# Non-interactive load generator for the inventory server.
+# Runs a weighted mix of the five RPCs from N concurrent workers (threads or asyncio tasks). With --rate the
+# load is open-loop: request i is due at start + i / rate whatever happened to earlier requests, and its
+# latency is measured from that due time, so a server that falls behind shows up as queueing delay
+# instead of a quietly lower request rate. Streams are drained before the clock stops.
+# update writes each row's Quantity_in_Stock back as it was sampled, so it costs the server a logged write
+# without changing the stock level; it is still left out of the default mix, as a row another client
+# changes meanwhile would be set back.
+
+METHODS = ('searchByID', 'search', 'searchRange', 'getDistribution', 'update')
+DEFAULT_MIX = 'searchByID=40,search=20,searchRange=10,getDistribution=20'
+# Rows fetched from the server to build request parameters from, and the columns those requests use
+DEFAULT_SAMPLE_SIZE = 10000
+SAMPLE_COLUMNS = ('Inventory_ID', 'Name', 'Price', 'Quantity_in_Stock')
+REPORTED_PERCENTILES = (50, 95, 99, 99.9)
+
+
+def parse_mix(mix):
+    weights = {}
+    for part in mix.split(','):
+        method, weight = part.split('=')
+        if method not in METHODS:
+            raise ValueError(f"Unknown method '{method}' in mix; expected one of {', '.join(METHODS)}.")
+        weights[method] = float(weight)
+    return weights
+
+
+class RequestFactory:
+    # Builds a reproducible request for each method from the IDs and names the server actually holds
+
+    def __init__(self, inventory, seed, range_key='Price', range_width=10.0):
+        self.inventory = inventory
+        self.random = random.Random(seed)
+        self.range_key = range_key
+        self.range_width = range_width
+
+    def make(self, method):
+        record = self.random.choice(self.inventory)
+        if method == 'searchByID':
+            return inventory_pb2.InventoryRequest(id=record.Inventory_ID)
+        if method == 'search':
+            return inventory_pb2.InventorySearchRequest(key_name='Name', key_value=record.Name)
+        if method == 'searchRange':
+            # Start at a real row's price so ranges fall where the rows are, as real queries tend to
+            start = float(getattr(record, self.range_key))
+            return inventory_pb2.InventoryRangeRequest(key_name=self.range_key, key_value_start=str(start),
+                                                       key_value_end=str(start + self.range_width))
+        if method == 'getDistribution':
+            return inventory_pb2.DistributionRequest(key_name=self.range_key,
+                                                     percentile=self.random.choice((50.0, 90.0, 99.0)))
+        # The value the row already holds; an empty value keeps a missing cell missing
+        quantity = '' if record.Quantity_in_Stock is None else str(record.Quantity_in_Stock)
+        return inventory_pb2.UpdateRequest(key_name='Inventory_ID', key_value=record.Inventory_ID,
+                                           val_name='Quantity_in_Stock', val_val_new=quantity)
+
+
+def fetch_inventory(stub, sample_size=DEFAULT_SAMPLE_SIZE):
+    # The first sample_size priced rows, to draw request parameters from: one query page of just the
+    # columns the requests use, rather than every record
+    rows, _ = query(stub, where=[('Price', 'range', (None, None))], columns=SAMPLE_COLUMNS, limit=sample_size)
+    return [SimpleNamespace(**row) for row in rows]
+
+
+def plan(weights, factory, count, seed):
+    chooser = random.Random(seed)
+    methods = chooser.choices(list(weights), weights=list(weights.values()), k=count)
+    return [(method, factory.make(method)) for method in methods]
+
+
+def summarize(samples, errors, elapsed):
+    report = {'requests': len(samples) + sum(errors.values()), 'errors': dict(errors), 'elapsed_seconds': elapsed,
+              'throughput_rps': (len(samples) + sum(errors.values())) / elapsed if elapsed else 0.0,
+              'methods': {}}
+    by_method = {}
+    for method, latency in samples:
+        by_method.setdefault(method, []).append(latency)
+    by_method['all'] = [latency for _, latency in samples]
+    for method, latencies in by_method.items():
+        if not latencies:
+            continue
+        values = np.array(latencies) * 1000.0
+        report['methods'][method] = {
+            'count': len(latencies),
+            'mean_ms': float(values.mean()),
+            **{f'p{percentile:g}_ms'.replace('.', ''): float(np.percentile(values, percentile))
+               for percentile in REPORTED_PERCENTILES},
+        }
+    return report
+
+
+def run_threads(target, requests, workers, rate):
+    pool = ChannelPool(target)
+    stub = pool.stub()
+    slots = itertools.count()
+    lock = threading.Lock()
+    samples = []
+    errors = {}
+    start = perf_counter()
+
+    def worker():
+        while True:
+            with lock:
+                slot = next(slots)
+            if slot >= len(requests):
+                return
+            method, request = requests[slot]
+            due = start + slot / rate if rate else perf_counter()
+            delay = due - perf_counter()
+            if delay > 0:
+                sleep(delay)
+            lag = perf_counter() - due
+            try:
+                _, response_time = requestResponseData(getattr(stub, method), request)
+                with lock:
+                    samples.append((method, lag + response_time))
+            except grpc.RpcError as error:
+                with lock:
+                    name = f'{method}:{error.code().name}'
+                    errors[name] = errors.get(name, 0) + 1
+
+    threads = [threading.Thread(target=worker) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = perf_counter() - start
+    pool.close()
+    return summarize(samples, errors, elapsed)
+
+
+async def run_asyncio(target, requests, workers, rate):
+    samples = []
+    errors = {}
+    pool = ChannelPool(target)
+    stub = pool.aio_stub()
+    slots = itertools.count()
+    start = perf_counter()
+
+    async def worker():
+        for slot in slots:
+            if slot >= len(requests):
+                return
+            method, request = requests[slot]
+            due = start + slot / rate if rate else perf_counter()
+            delay = due - perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            began = perf_counter()
+            try:
+                call = getattr(stub, method)(request)
+                if method == 'searchRange':
+                    async for _ in call:
+                        pass
+                else:
+                    await call
+                samples.append((method, perf_counter() - began + max(0.0, began - due)))
+            except grpc.aio.AioRpcError as error:
+                name = f'{method}:{error.code().name}'
+                errors[name] = errors.get(name, 0) + 1
+
+    await asyncio.gather(*(worker() for _ in range(workers)))
+    elapsed = perf_counter() - start
+    await pool.close_aio()
+    pool.close()
+    return summarize(samples, errors, elapsed)
+
+
+def run_benchmark(target, mix=DEFAULT_MIX, workers=8, rate=0.0, requests=1000, mode='threads', seed=0,
+                  sample_size=DEFAULT_SAMPLE_SIZE):
+    with ChannelPool(target) as pool:
+        inventory = fetch_inventory(pool.stub(), sample_size)
+    if not inventory:
+        raise RuntimeError(f"Server at {target} returned no inventory to build requests from.")
+    workload = plan(parse_mix(mix), RequestFactory(inventory, seed), requests, seed)
+    if mode == 'asyncio':
+        report = asyncio.run(run_asyncio(target, workload, workers, rate))
+    else:
+        report = run_threads(target, workload, workers, rate)
+    report['config'] = {'target': target, 'mix': mix, 'workers': workers, 'rate': rate, 'mode': mode, 'seed': seed,
+                        'sample_size': sample_size}
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load-test an inventory gRPC server')
+    parser.add_argument('--target', default='localhost:50051', help='host:port, or a comma-separated list to spread load over')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='comma-separated method=weight pairs')
+    parser.add_argument('--workers', type=int, default=8, help='concurrent threads or asyncio tasks')
+    parser.add_argument('--rate', type=float, default=0.0,
+                        help='open-loop request rate per second across all workers; 0 sends as fast as possible')
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--mode', choices=('threads', 'asyncio'), default='threads')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--sample', type=int, default=DEFAULT_SAMPLE_SIZE,
+                        help='rows fetched from the server to build requests from')
+    parser.add_argument('--output', help='write the JSON report here instead of stdout')
+    args = parser.parse_args()
+
+    report = run_benchmark(args.target, args.mix, args.workers, args.rate, args.requests, args.mode, args.seed,
+                           args.sample)
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(report, output_file, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
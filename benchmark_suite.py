@@ -0,0 +1,148 @@
+from concurrent import futures
+import argparse
+import json
+import os
+import platform
+import tempfile
+from time import perf_counter
+import grpc
+import numpy as np
+import pandas as pd
+import inventory_pb2_grpc
+import snapshot
+from benchmark import RequestFactory, plan, run_threads
+from inventory_store import ColumnStore
+from metrics import MetricsInterceptor
+from persistence import WriteBehindLog
+from server import InventoryServiceServicer, build_indexes
+
+# Scaling benchmark: generates synthetic inventories of each requested size, serves each from an
+# in-process server on localhost and times every RPC against it, so results depend only on this machine.
+# Generation is seeded, so two runs with the same arguments query the same rows in the same order.
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+BENCHMARKED_METHODS = ('searchByID', 'search', 'searchRange', 'getDistribution', 'update')
+
+# Rows sharing a Name, on average, so search returns a handful of variants rather than one row
+ROWS_PER_NAME = 4
+
+# Roughly how many rows each searchRange stream returns, whatever the inventory size
+SEARCH_RANGE_ROWS = 100
+
+# Rows drawn from the inventory to build request parameters from
+REQUEST_SAMPLE_SIZE = 10000
+
+
+def generate_inventory(rows, seed=0):
+    # Same columns and types as InventoryData.xlsx, with skewed prices and stock levels instead of uniform ones
+    generator = np.random.default_rng(seed)
+    positions = np.arange(1, rows + 1)
+    price = np.round(generator.lognormal(mean=3.5, sigma=1.0, size=rows), 2) + 0.99
+    quantity_in_stock = generator.negative_binomial(2, 0.02, size=rows)
+    reorder_level = np.maximum(1, (quantity_in_stock * generator.uniform(0.5, 1.5, size=rows)).astype(np.int64))
+    discontinued = np.where(generator.random(rows) < 0.05, 'yes', None)
+    name_numbers = generator.integers(1, max(1, rows // ROWS_PER_NAME) + 1, size=rows)
+    return pd.DataFrame({
+        'Inventory_ID': pd.Series(positions).astype(str).str.zfill(len(str(rows))).radd('IN'),
+        'Name': pd.Series(name_numbers).astype(str).radd('Item '),
+        'Description': pd.Series(positions).astype(str).radd('Desc '),
+        'Price': price,
+        'Quantity_in_Stock': quantity_in_stock,
+        'Inventory_Value': np.round(price * quantity_in_stock).astype(np.int64),
+        'Reorder_Level': reorder_level,
+        'Reorder_Time_In_Days': generator.integers(1, 15, size=rows),
+        'Quantity_in_Reorder': generator.choice([50, 100, 150], size=rows),
+        'Discontinued': discontinued,
+    })
+
+
+def write_inventory(df, excel_file_path):
+    # A workbook with just the header, and a snapshot written after it holding the rows. The server
+    # starts from a snapshot that is newer than its workbook, and writing millions of rows to xlsx
+    # would take longer than the benchmark itself. It holds the server's indexes too, as the snapshot a
+    # server writes does.
+    pd.DataFrame(columns=df.columns).to_excel(excel_file_path, index=False, engine='openpyxl')
+    store = ColumnStore.from_dataframe(df)
+    snapshot.save(store, excel_file_path + '.snapshot', build_indexes(store))
+
+
+def start_server(excel_file_path, max_workers, query_cache_size):
+    # update still appends and fsyncs its log entry, but the background workbook rewrite is skipped:
+    # it is off the request path and would otherwise write the placeholder workbook out in full
+    change_log = WriteBehindLog(excel_file_path + '.changes', lambda: None, lambda df: None)
+    change_log.start()
+    started = perf_counter()
+    servicer = InventoryServiceServicer(excel_file_path, change_log=change_log, query_cache_size=query_cache_size)
+    startup_seconds = perf_counter() - started
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=max_workers),
+                         interceptors=[MetricsInterceptor(servicer.metrics)])
+    inventory_pb2_grpc.add_InventoryServiceServicer_to_server(servicer, server)
+    port = server.add_insecure_port('localhost:0')
+    server.start()
+    return server, servicer, f'localhost:{port}', startup_seconds
+
+
+def benchmark_size(rows, workdir, calls, warmup, workers, max_workers, query_cache_size, seed):
+    df = generate_inventory(rows, seed)
+    excel_file_path = os.path.join(workdir, f'inventory_{rows}.xlsx')
+    write_inventory(df, excel_file_path)
+    sample = list(df.sample(min(rows, REQUEST_SAMPLE_SIZE), random_state=seed).itertuples(index=False))
+    # The middle half of the prices holds half the rows, which sets how wide a range should be
+    price_quartiles = df['Price'].quantile([0.25, 0.75])
+    range_width = float(price_quartiles.iloc[1] - price_quartiles.iloc[0]) * SEARCH_RANGE_ROWS / (rows / 2)
+    del df
+
+    server, servicer, target, startup_seconds = start_server(excel_file_path, max_workers, query_cache_size)
+    result = {'rows': rows, 'startup_seconds': startup_seconds, 'methods': {}}
+    try:
+        for method in BENCHMARKED_METHODS:
+            factory = RequestFactory(sample, seed, range_width=range_width)
+            run_threads(target, plan({method: 1}, factory, warmup, seed + 1), workers, 0)
+            report = run_threads(target, plan({method: 1}, factory, calls, seed), workers, 0)
+            result['methods'][method] = dict(report['methods'].get(method, {}), errors=report['errors'],
+                                             throughput_rps=report['throughput_rps'])
+    finally:
+        server.stop(None)
+        servicer.close()
+    return result
+
+
+def environment():
+    return {'python': platform.python_version(), 'platform': platform.platform(), 'cpu_count': os.cpu_count(),
+            'grpc': grpc.__version__, 'numpy': np.__version__, 'pandas': pd.__version__}
+
+
+def run_suite(sizes=DEFAULT_SIZES, calls=500, warmup=50, workers=1, max_workers=10, query_cache_size=0, seed=0,
+              workdir=None):
+    config = {'sizes': list(sizes), 'calls': calls, 'warmup': warmup, 'workers': workers, 'max_workers': max_workers,
+              'query_cache_size': query_cache_size, 'seed': seed}
+    with tempfile.TemporaryDirectory(dir=workdir) as directory:
+        results = [benchmark_size(rows, directory, calls, warmup, workers, max_workers, query_cache_size, seed)
+                   for rows in sizes]
+    return {'environment': environment(), 'config': config, 'results': results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark every RPC against synthetic inventories of several sizes')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES),
+                        help='inventory sizes in rows, e.g. 1000 100000 10000000')
+    parser.add_argument('--calls', type=int, default=500, help='timed calls per RPC and size')
+    parser.add_argument('--warmup', type=int, default=50, help='untimed calls per RPC and size beforehand')
+    parser.add_argument('--workers', type=int, default=1, help='concurrent client threads')
+    parser.add_argument('--max-workers', type=int, default=10, help='server thread pool size')
+    parser.add_argument('--query-cache-size', type=int, default=0,
+                        help='server query cache entries; 0 times every search and getDistribution cold')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workdir', help='where the generated inventories go; a temporary directory by default')
+    parser.add_argument('--output', default='benchmark_results.json')
+    args = parser.parse_args()
+
+    report = run_suite(args.sizes, args.calls, args.warmup, args.workers, args.max_workers, args.query_cache_size,
+                       args.seed, args.workdir)
+    with open(args.output, 'w') as output_file:
+        json.dump(report, output_file, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
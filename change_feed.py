@@ -0,0 +1,75 @@
+import queue
+import threading
+
+
+class Subscription:
+    # One watcher's queue of (sequence, inventory_ids, column) events, starting after sequence start
+
+    def __init__(self, queue_size, start, notify=None):
+        self.events = queue.Queue(queue_size)
+        self.start = start
+        self.notify = notify
+        self.dropped = False
+
+    def get(self, timeout):
+        # The next event, or None if there was none within timeout seconds (0 to not wait)
+        try:
+            return self.events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class ChangeFeed:
+    # Fans out the row changes update makes to watchChanges subscribers.
+    # publish() is called under the data's write lock and never blocks: a subscriber that falls queue_size
+    # events behind is dropped instead, and its stream ends so the client knows it missed changes.
+
+    def __init__(self, queue_size):
+        self.queue_size = queue_size
+        self.lock = threading.Lock()
+        self.subscribers = set()
+        self.sequence = 0
+        # Events kept back until release(), or None to send them straight away (see hold())
+        self.held = None
+
+    def subscribe(self, notify=None):
+        # notify, if given, is called from the publishing thread after each event is queued or on being dropped
+        with self.lock:
+            subscription = Subscription(self.queue_size, self.sequence, notify)
+            self.subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            self.subscribers.discard(subscription)
+
+    def hold(self):
+        # From now on published events wait for release(): in prefork mode a worker tells its watchers about
+        # a change only once every worker has applied it (see prefork.py)
+        with self.lock:
+            self.held = []
+
+    def release(self):
+        with self.lock:
+            held, self.held = self.held, []
+            for inventory_ids, column in held:
+                self.deliver(inventory_ids, column)
+
+    def publish(self, inventory_ids, column):
+        with self.lock:
+            if self.held is not None:
+                self.held.append((inventory_ids, column))
+            else:
+                self.deliver(inventory_ids, column)
+
+    def deliver(self, inventory_ids, column):
+        # Called with the lock held
+        self.sequence += 1
+        for subscription in list(self.subscribers):
+            try:
+                subscription.events.put_nowait((self.sequence, inventory_ids, column))
+            except queue.Full:
+                subscription.dropped = True
+                self.subscribers.discard(subscription)
+            if subscription.notify is not None:
+                subscription.notify()
@@ -1,30 +1,37 @@
 import statistics
-import inventory_pb2_grpc
 from time import time
 import inventory_pb2
 import grpc
-import pandas as pd
+import excel_loader
+import sys
+from inventory_client import ChannelPool
 
 def requestResponseData(method, *args):
     start_time = time()
     response = method(*args)
+    if isinstance(response, grpc.Call):
+        # A server-streaming call returns before any message arrives; time the whole stream
+        response = list(response)
     end_time = time()
     response_time = end_time - start_time
     return response, response_time
 
+# The workbook columns an InventoryRecord can carry
+RECORD_COLUMNS = list(inventory_pb2.InventoryRecord.DESCRIPTOR.fields_by_name)
+
 def search_in_excel(file_path):
-    df = pd.read_excel(file_path)
-    result = df.to_dict(orient='records')
-    return result
+    # Streams the sheet row by row rather than loading it whole; only the record columns are kept
+    return excel_loader.iter_records(file_path, columns=RECORD_COLUMNS)
 
-def run():
-    with grpc.insecure_channel('54.160.226.4:50051') as channel:
-        stub = inventory_pb2_grpc.InventoryServiceStub(channel)
+def run(addresses='localhost:50051'):
+    # addresses: one host:port or a comma-separated list; calls are spread over all of them
+    with ChannelPool(addresses) as pool:
+        stub = pool.stub()
         excel_file_path = r'InventoryData.xlsx'
 
         inventory_data = search_in_excel(excel_file_path)
 
-        if not inventory_data:
+        if next(inventory_data, None) is None:
             print("No Inventory data found in the Excel file.")
             return
 
@@ -85,7 +92,8 @@ def run():
                 # Log the results
                 with open("log_file.txt", "a") as log_file:
                     log_file.write(
-                        f"Search by ID - Average Response Time for {num_calls} calls: {average_response_time} seconds\n")
+                        f"Search by ID - Average Response Time for {num_calls} calls: "
+                        f"{average_response_time} seconds\n")
                     log_file.write(
                         f"Search by ID - Standard Deviation for {num_calls} calls: {std_deviation} seconds\n")
                     log_file.write("---------------------------------------------------\n")
@@ -164,9 +172,11 @@ def run():
 
                 with open("log_file.txt", "a") as log_file:
                     log_file.write(
-                        f"Search by Key-Value Pair - Average Response Time for {num_calls} calls: {average_response_time} seconds\n")
+                        f"Search by Key-Value Pair - Average Response Time for {num_calls} calls: "
+                        f"{average_response_time} seconds\n")
                     log_file.write(
-                        f"Search by Key-Value Pair - Standard Deviation for {num_calls} calls: {std_deviation} seconds\n")
+                        f"Search by Key-Value Pair - Standard Deviation for {num_calls} calls: "
+                        f"{std_deviation} seconds\n")
                     log_file.write("---------------------------------------------------\n")
 
 
@@ -249,7 +259,8 @@ def run():
                 with open("log_file.txt", "a") as log_file:
 
                     log_file.write(
-                        f"Search within a Range - Average Response Time for {num_calls} calls: {average_response_time} seconds\n")
+                        f"Search within a Range - Average Response Time for {num_calls} calls: "
+                        f"{average_response_time} seconds\n")
 
                     log_file.write(
                         f"Search within a Range - Standard Deviation for {num_calls} calls: {std_deviation} seconds\n")
@@ -314,7 +325,8 @@ def run():
                 with open("log_file.txt", "a") as log_file:
 
                     log_file.write(
-                        f"Calculate Percentile - Average Response Time for {num_calls} calls: {average_response_time} seconds\n")
+                        f"Calculate Percentile - Average Response Time for {num_calls} calls: "
+                        f"{average_response_time} seconds\n")
 
                     log_file.write(
                         f"Calculate Percentile - Standard Deviation for {num_calls} calls: {std_deviation} seconds\n")
@@ -394,7 +406,8 @@ def run():
                 with open("log_file.txt", "a") as log_file:
 
                     log_file.write(
-                        f"Update Value - Average Response Time for {num_calls} calls: {average_response_time} seconds\n")
+                        f"Update Value - Average Response Time for {num_calls} calls: "
+                        f"{average_response_time} seconds\n")
 
                     log_file.write(
                         f"Update Value - Standard Deviation for {num_calls} calls: {std_deviation} seconds\n")
@@ -409,4 +422,4 @@ def run():
                 print("Invalid choice. Please enter 1, 2, 3, 4, 5 or 6.")
 
 if __name__ == "__main__":
-    run()
\ No newline at end of file
+    run(*sys.argv[1:2])
\ No newline at end of file
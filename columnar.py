@@ -0,0 +1,86 @@
+import numpy as np
+import inventory_pb2
+
+# The export RPC's wire format. Each column travels as ColumnChunk messages whose values are the column's
+# NumPy array sliced and sent as raw little-endian bytes, the same layout as a packed repeated double or
+# fixed64 field, so both ends convert with one copy instead of a protobuf call per value. Text columns send
+# int32 codes plus a dictionary that grows chunk by chunk, entries ordered by where they are first used.
+
+
+def first_use_codes(codes, valid, categories):
+    # (codes renumbered in order of first use, the dictionary in that order); unused categories are dropped
+    used, first = np.unique(codes[valid], return_index=True)
+    order = used[np.argsort(first)]
+    mapping = np.zeros(max(len(categories), 1), dtype=np.int32)
+    mapping[order] = np.arange(len(order), dtype=np.int32)
+    renumbered = np.where(valid, mapping[codes], 0).astype(np.int32)
+    return renumbered, [value if isinstance(value, str) else str(value) for value in
+                        (categories[code] for code in order.tolist())]
+
+
+def column_chunks(column, values, valid, categories, chunk_rows):
+    # ColumnChunk messages for one column; categories is None for a numeric column
+    if categories is not None:
+        values, dictionary = first_use_codes(values, valid, categories)
+    values = values.astype(values.dtype.newbyteorder('<'), copy=False)
+    sent = 0
+    for start in range(0, max(len(values), 1), chunk_rows):
+        chunk_values = values[start:start + chunk_rows]
+        chunk_valid = valid[start:start + chunk_rows]
+        chunk = inventory_pb2.ColumnChunk(column=column, start_row=start, rows=len(chunk_values),
+                                          dtype=values.dtype.str, values=chunk_values.tobytes(),
+                                          coded=categories is not None)
+        if not chunk_valid.all():
+            chunk.valid = np.packbits(chunk_valid, bitorder='little').tobytes()
+        if categories is not None:
+            used = chunk_values[chunk_valid]
+            end = int(used.max()) + 1 if len(used) else 0
+            if end > sent:
+                chunk.dictionary.extend(dictionary[sent:end])
+                sent = end
+        yield chunk
+
+
+def export_chunks(arrays, chunk_rows):
+    # The stream for (column, values, valid, categories) arrays: each block of rows, column by column
+    for chunks in zip(*(column_chunks(column, values, valid, categories, chunk_rows)
+                        for column, values, valid, categories in arrays)):
+        yield from chunks
+
+
+def decode_chunks(chunks):
+    # {column: (values, valid)} from a stream of ColumnChunks, in the order the columns arrived. Numeric
+    # columns come back as the server's int64 or float64 arrays, text columns as object arrays of str with
+    # None where valid is False.
+    parts = {}
+    for chunk in chunks:
+        values, valid, dictionary, coded = parts.setdefault(chunk.column, ([], [], [], chunk.coded))
+        values.append(np.frombuffer(chunk.values, dtype=chunk.dtype))
+        if chunk.valid:
+            valid.append(np.unpackbits(np.frombuffer(chunk.valid, dtype=np.uint8), count=chunk.rows,
+                                       bitorder='little').astype(bool))
+        else:
+            valid.append(np.ones(chunk.rows, dtype=bool))
+        dictionary.extend(chunk.dictionary)
+
+    columns = {}
+    for column, (values, valid, dictionary, coded) in parts.items():
+        values = np.concatenate(values)
+        valid = np.concatenate(valid)
+        if coded:
+            lookup = np.empty(len(dictionary) + 1, dtype=object)
+            lookup[:-1] = dictionary
+            values = lookup[np.where(valid, values, len(dictionary))]
+        columns[column] = (values, valid)
+    return columns
+
+
+def to_dataframe(columns):
+    # decode_chunks' output as a DataFrame; numeric columns with missing cells become float64 with NaN
+    import pandas as pd  # Only needed by callers that want a DataFrame
+    data = {}
+    for column, (values, valid) in columns.items():
+        if values.dtype != object and not valid.all():
+            values = np.where(valid, values, np.nan)
+        data[column] = values
+    return pd.DataFrame(data)
@@ -0,0 +1,89 @@
+import grpc
+from metrics import wrap_handler, method_name
+
+# Response compression, chosen per method on the server and overridable per call by the client.
+# gzip and deflate trade server and client CPU for fewer bytes on the wire, which pays off for large streams
+# such as wide searchRange results over slow links; small unary answers are usually better left alone.
+
+ALGORITHMS = {
+    'none': grpc.Compression.NoCompression,
+    'deflate': grpc.Compression.Deflate,
+    'gzip': grpc.Compression.Gzip,
+}
+
+# Request metadata naming the algorithm the client wants its responses compressed with
+METADATA_KEY = 'inventory-response-compression'
+
+
+def parse_method_compression(spec):
+    # 'searchRange=gzip,query=deflate' -> {method: algorithm name}; '*' stands for every other method
+    method_compression = {}
+    for item in filter(None, (item.strip() for item in spec.split(','))):
+        method, _, algorithm = item.partition('=')
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"Unknown compression '{algorithm}' for '{method}'; use one of {', '.join(ALGORITHMS)}.")
+        method_compression[method.strip()] = algorithm
+    return method_compression
+
+
+def call_options(algorithm):
+    # Keyword arguments for a stub call that compress its request with algorithm and ask for responses to be
+    # compressed the same way
+    return {'compression': ALGORITHMS[algorithm], 'metadata': ((METADATA_KEY, algorithm),)}
+
+
+def response_compression(method_compression, handler_call_details):
+    # The grpc.Compression for this call's responses, or None to leave the server's default
+    for key, value in handler_call_details.invocation_metadata or ():
+        if key == METADATA_KEY and value in ALGORITHMS:
+            return ALGORITHMS[value]
+    algorithm = method_compression.get(method_name(handler_call_details), method_compression.get('*'))
+    return ALGORITHMS[algorithm] if algorithm else None
+
+
+class CompressionInterceptor(grpc.ServerInterceptor):
+    # Sets each call's response compression for the thread-pool server; calls with nothing to set are untouched
+
+    def __init__(self, method_compression):
+        self.method_compression = method_compression
+
+    def intercept_service(self, continuation, handler_call_details):
+        handler = continuation(handler_call_details)
+        algorithm = response_compression(self.method_compression, handler_call_details)
+        if algorithm is None:
+            return handler
+
+        def compressed(method, behavior):
+            # A streaming behaviour's generator is returned as is, so one wrapper serves both kinds
+            def handle(request, context):
+                context.set_compression(algorithm)
+                return behavior(request, context)
+            return handle
+        return wrap_handler(handler, method_name(handler_call_details), compressed, compressed)
+
+
+class AsyncCompressionInterceptor(grpc.aio.ServerInterceptor):
+    # The same for the grpc.aio server
+
+    def __init__(self, method_compression):
+        self.method_compression = method_compression
+
+    async def intercept_service(self, continuation, handler_call_details):
+        handler = await continuation(handler_call_details)
+        algorithm = response_compression(self.method_compression, handler_call_details)
+        if algorithm is None:
+            return handler
+
+        def unary(method, behavior):
+            async def handle(request, context):
+                context.set_compression(algorithm)
+                return await behavior(request, context)
+            return handle
+
+        def streaming(method, behavior):
+            async def handle(request, context):
+                context.set_compression(algorithm)
+                async for response in behavior(request, context):
+                    yield response
+            return handle
+        return wrap_handler(handler, method_name(handler_call_details), unary, streaming)
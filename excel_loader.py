@@ -0,0 +1,176 @@
+import numpy as np
+import openpyxl
+from inventory_store import ColumnStore, INT64_MAX, INT64_MIN
+
+# Streams an .xlsx sheet with openpyxl's read-only mode instead of pd.read_excel. Rows are read a chunk at a
+# time and each chunk's cells are converted straight to the ColumnStore's typed arrays, so peak memory is the
+# finished columns plus one chunk of rows rather than a DataFrame and the copies made from it.
+# Types follow pd.read_excel: whole-number columns become int64, numeric columns with blanks or fractions
+# float64, and anything else is interned. As there, text that reads as a number counts as one and the
+# usual missing-value markers count as blanks.
+
+DEFAULT_CHUNK_SIZE = 100000
+
+# pandas' default na_values
+NA_STRINGS = frozenset(['', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+                        '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null'])
+
+
+class ColumnBuilder:
+    # One column, numeric until a cell that isn't a number turns up, then interned from there on
+
+    def __init__(self):
+        self.numeric = True
+        self.chunks = []
+        self.categories = []
+        self.category_codes = {}
+
+    def add(self, values):
+        values = [None if isinstance(value, str) and value in NA_STRINGS else value for value in values]
+        numbers = to_numbers(values) if self.numeric else None
+        if numbers is not None:
+            valid = np.fromiter((value is not None for value in numbers), dtype=bool, count=len(numbers))
+            # Whole numbers too big for int64 (as Excel's 1E+20) leave the chunk float64, as pandas does
+            if valid.all() and all((isinstance(value, int) or value.is_integer()) and INT64_MIN <= value <= INT64_MAX
+                                   for value in numbers):
+                array = np.array(numbers, dtype=np.int64)
+            else:
+                array = np.array([np.nan if value is None else value for value in numbers], dtype=np.float64)
+            # Cells that were text are kept as text in case the column turns out not to be numeric
+            self.chunks.append((array, valid, values if numbers is not values else None))
+            return
+        if self.numeric:
+            # Re-read what was stored as numbers as interned values, as pandas does for a mixed column
+            self.numeric = False
+            numeric_chunks, self.chunks = self.chunks, []
+            for array, valid, text in numeric_chunks:
+                if text is None:
+                    text = [value.item() if is_valid else None for value, is_valid in zip(array, valid)]
+                self.chunks.append(self.intern(text))
+        self.chunks.append(self.intern(values))
+
+    def intern(self, values):
+        codes = np.empty(len(values), dtype=np.int32)
+        valid = np.ones(len(values), dtype=bool)
+        category_codes = self.category_codes
+        for position, value in enumerate(values):
+            if value is None:
+                codes[position] = 0
+                valid[position] = False
+                continue
+            if isinstance(value, float) and value.is_integer():
+                value = int(value)  # pd.read_excel reads 5.0 as 5
+            code = category_codes.get(value)
+            if code is None:
+                code = category_codes[value] = len(self.categories)
+                self.categories.append(value)
+            codes[position] = code
+        return codes, valid
+
+    def finish(self, store, column):
+        if not self.chunks:
+            # An empty sheet's columns have no type; pandas leaves them as objects
+            store.add_interned(column, np.zeros(0, dtype=np.int32), [], np.zeros(0, dtype=bool))
+            return
+        values = np.concatenate([chunk[0] for chunk in self.chunks])
+        valid = np.concatenate([chunk[1] for chunk in self.chunks])
+        self.chunks = []
+        if self.numeric:
+            # Integer chunks alongside any float chunk come out as float64, as in a pandas column
+            store.add_numeric(column, values, valid)
+        else:
+            store.add_interned(column, values, self.categories, valid)
+
+
+def to_numbers(values):
+    # values with numeric text parsed, or None if any cell isn't a number. values itself when it holds no text.
+    numbers = values
+    for position, value in enumerate(values):
+        if value is None or isinstance(value, (int, float)):
+            continue
+        if not isinstance(value, str):
+            return None
+        try:
+            number = int(value)
+        except ValueError:
+            try:
+                number = float(value)
+            except ValueError:
+                return None
+        if numbers is values:
+            numbers = list(values)
+        numbers[position] = number
+    return numbers
+
+
+def read_rows(excel_file_path):
+    # Header names and an iterator over the data rows as tuples padded to the header's width.
+    # Blank rows after the last row with data are dropped, as pd.read_excel does.
+    workbook = openpyxl.load_workbook(excel_file_path, read_only=True, data_only=True)
+    sheet = workbook.worksheets[0]
+    rows = sheet.iter_rows(values_only=True)
+    header = next(rows, ())
+    while header and header[-1] is None:
+        header = header[:-1]
+    names = [str(name) if name is not None else f'Unnamed: {position}' for position, name in enumerate(header)]
+    width = len(names)
+
+    def data_rows():
+        blank_rows = 0
+        try:
+            for row in rows:
+                row = tuple(row[:width]) + (None,) * (width - len(row))
+                if all(value is None for value in row):
+                    blank_rows += 1
+                    continue
+                for _ in range(blank_rows):
+                    yield (None,) * width
+                blank_rows = 0
+                yield row
+        finally:
+            workbook.close()
+
+    total = sheet.max_row - 1 if sheet.max_row else None
+    return names, data_rows(), total
+
+
+def load(excel_file_path, columns=None, chunk_size=DEFAULT_CHUNK_SIZE, progress=None):
+    # ColumnStore of the first sheet, keeping only columns (all of them if None).
+    # progress(rows_loaded, total_rows) is called after each chunk; total_rows is the sheet's own
+    # estimate and may be None or count trailing blank rows.
+    names, rows, total = read_rows(excel_file_path)
+    kept = [position for position, name in enumerate(names) if columns is None or name in columns]
+    builders = [ColumnBuilder() for _ in kept]
+    loaded = 0
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            loaded += add_chunk(builders, kept, chunk)
+            chunk = []
+            if progress is not None:
+                progress(loaded, total)
+    if chunk:
+        loaded += add_chunk(builders, kept, chunk)
+    if progress is not None:
+        progress(loaded, loaded)
+
+    store = ColumnStore(loaded)
+    for builder, position in zip(builders, kept):
+        builder.finish(store, names[position])
+    return store
+
+
+def add_chunk(builders, kept, chunk):
+    cells = list(zip(*chunk))
+    for builder, position in zip(builders, kept):
+        builder.add(cells[position])
+    return len(chunk)
+
+
+def iter_records(excel_file_path, columns=None):
+    # Rows as {column: value} dicts one at a time, for callers that don't need the whole sheet at once
+    names, rows, _ = read_rows(excel_file_path)
+    kept = [(position, name) for position, name in enumerate(names) if columns is None or name in columns]
+    for row in rows:
+        yield {name: row[position] for position, name in kept}
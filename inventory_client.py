@@ -0,0 +1,582 @@
+import asyncio
+import itertools
+import threading
+import time
+import grpc
+import inventory_pb2
+import inventory_pb2_grpc
+from compression import call_options
+import columnar
+from lru import LRUCache
+
+# Reusable client for a fleet of inventory servers.
+# A ChannelPool opens a few long-lived channels to each server address and hands out stubs that send each
+# call down the next channel in turn, so load spreads over every server and connection. The same pool serves
+# plain and asyncio callers; asyncio channels are opened on first use in each event loop.
+
+# Several channels per server so one HTTP/2 connection's stream limit and I/O thread don't cap throughput
+DEFAULT_CHANNELS_PER_ADDRESS = 2
+
+# Largest message either side will accept, e.g. a batchSearchByID answer for many IDs
+MAX_MESSAGE_LENGTH = 64 * 1024 * 1024
+
+# Keepalive pings find dead connections before a call does; the server accepts pings this often (see server.py)
+DEFAULT_CHANNEL_OPTIONS = (
+    ('grpc.keepalive_time_ms', 30000),
+    ('grpc.keepalive_timeout_ms', 10000),
+    ('grpc.keepalive_permit_without_calls', 1),
+    ('grpc.http2.max_pings_without_data', 0),
+    ('grpc.max_send_message_length', MAX_MESSAGE_LENGTH),
+    ('grpc.max_receive_message_length', MAX_MESSAGE_LENGTH),
+    # Reconnect to a restarted server within seconds rather than gRPC's default of up to two minutes
+    ('grpc.max_reconnect_backoff_ms', 5000),
+    # Channels to the same address would otherwise share one connection from the global subchannel pool
+    ('grpc.use_local_subchannel_pool', 1),
+)
+
+# Seconds between attempts to reopen a broken watchChanges stream
+WATCH_RETRY_INTERVAL = 1.0
+
+# Unary reads are retried on another channel when a server is unreachable; writes and streams are not
+RETRYABLE_METHODS = frozenset(('searchByID', 'search', 'getDistribution', 'batchSearchByID', 'getStats',
+                               'aggregate'))
+
+
+def parse_addresses(addresses):
+    # Accepts a list of host:port strings or one comma-separated string
+    if isinstance(addresses, str):
+        addresses = addresses.split(',')
+    addresses = [address.strip() for address in addresses if address.strip()]
+    if not addresses:
+        raise ValueError("At least one server address is required.")
+    return addresses
+
+
+class ChannelPool:
+    # method_compression maps method names ('*' for the rest) to 'gzip', 'deflate' or 'none': the pool's stubs
+    # compress those calls' requests and ask the server to compress the responses
+
+    def __init__(self, addresses, channels_per_address=DEFAULT_CHANNELS_PER_ADDRESS, options=DEFAULT_CHANNEL_OPTIONS,
+                 method_compression=None):
+        self.addresses = parse_addresses(addresses)
+        self.channels_per_address = channels_per_address
+        self.options = list(options)
+        self.method_compression = method_compression or {}
+        # Interleaved by address, so consecutive calls go to different servers
+        self.targets = [address for _ in range(channels_per_address) for address in self.addresses]
+        self.channels = [grpc.insecure_channel(target, options=self.options) for target in self.targets]
+        self.stubs = [inventory_pb2_grpc.InventoryServiceStub(channel) for channel in self.channels]
+        self.turns = itertools.count()
+        self.aio_channels = {}
+        self.aio_stubs = {}
+
+    def __len__(self):
+        return len(self.targets)
+
+    def rotation(self, stubs):
+        # Every stub once, starting at the next turn; neighbours are on different addresses
+        start = next(self.turns)
+        return [stubs[(start + offset) % len(stubs)] for offset in range(len(stubs))]
+
+    def call_options(self, method):
+        algorithm = self.method_compression.get(method, self.method_compression.get('*'))
+        return call_options(algorithm) if algorithm else {}
+
+    def next_stub(self):
+        return self.stubs[next(self.turns) % len(self.stubs)]
+
+    def loop_stubs(self):
+        # grpc.aio channels belong to the event loop that opened them
+        loop = asyncio.get_running_loop()
+        stubs = self.aio_stubs.get(loop)
+        if stubs is None:
+            channels = [grpc.aio.insecure_channel(target, options=self.options) for target in self.targets]
+            stubs = [inventory_pb2_grpc.InventoryServiceStub(channel) for channel in channels]
+            self.aio_channels[loop] = channels
+            self.aio_stubs[loop] = stubs
+        return stubs
+
+    def next_aio_stub(self):
+        stubs = self.loop_stubs()
+        return stubs[next(self.turns) % len(stubs)]
+
+    def stub(self):
+        # Drop-in for InventoryServiceStub that balances every call over the pool
+        return PooledStub(self)
+
+    def aio_stub(self):
+        return AsyncPooledStub(self)
+
+    def close(self):
+        for channel in self.channels:
+            channel.close()
+
+    async def close_aio(self):
+        # Closes the asyncio channels opened in the running event loop
+        loop = asyncio.get_running_loop()
+        for channel in self.aio_channels.pop(loop, []):
+            await channel.close()
+        self.aio_stubs.pop(loop, None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class PooledStub:
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def __getattr__(self, method):
+        options = self.pool.call_options(method)
+        if method not in RETRYABLE_METHODS:
+            return lambda *args, **kwargs: getattr(self.pool.next_stub(), method)(*args, **{**options, **kwargs})
+
+        def call(*args, **kwargs):
+            stubs = self.pool.rotation(self.pool.stubs)
+            for attempt, stub in enumerate(stubs):
+                try:
+                    return getattr(stub, method)(*args, **{**options, **kwargs})
+                except grpc.RpcError as error:
+                    if error.code() != grpc.StatusCode.UNAVAILABLE or attempt == len(stubs) - 1:
+                        raise
+        return call
+
+
+class AsyncPooledStub:
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def __getattr__(self, method):
+        options = self.pool.call_options(method)
+        if method not in RETRYABLE_METHODS:
+            return lambda *args, **kwargs: getattr(self.pool.next_aio_stub(), method)(*args, **{**options, **kwargs})
+
+        async def call(*args, **kwargs):
+            stubs = self.pool.rotation(self.pool.loop_stubs())
+            for attempt, stub in enumerate(stubs):
+                try:
+                    return await getattr(stub, method)(*args, **{**options, **kwargs})
+                except grpc.aio.AioRpcError as error:
+                    if error.code() != grpc.StatusCode.UNAVAILABLE or attempt == len(stubs) - 1:
+                        raise
+        return call
+
+
+def batch_search_by_id(stub, inventory_ids):
+    # Look up many IDs in one round trip; returns {Inventory_ID: InventoryRecord} for the IDs that were found
+    response = stub.batchSearchByID(inventory_pb2.InventoryBatchRequest(ids=inventory_ids))
+    return {inventory_id: record for inventory_id, record in zip(inventory_ids, response.records)
+            if record.Inventory_ID}
+
+
+def bulk_update(stub, updates):
+    # Apply (key_name, key_value, val_name, val_val_new) tuples atomically; raises grpc.RpcError if any fails
+    response = stub.bulkUpdate(inventory_pb2.BulkUpdateRequest(updates=[
+        inventory_pb2.UpdateRequest(key_name=key_name, key_value=key_value, val_name=val_name, val_val_new=val_val_new)
+        for key_name, key_value, val_name, val_val_new in updates
+    ]))
+    return response.success
+
+
+def stream_search_by_id(stub, inventory_ids):
+    # Look IDs up over one bidirectional stream; yields (Inventory_ID, InventoryRecord or None) as results arrive.
+    # inventory_ids can be any iterable, including an endless generator fed by a pipeline
+    pending = {}
+
+    def requests():
+        for position, inventory_id in enumerate(inventory_ids):
+            pending[str(position)] = inventory_id
+            yield inventory_pb2.InventoryRequest(id=inventory_id, correlation_id=str(position))
+
+    for result in stub.searchByIDStream(requests()):
+        yield pending.pop(result.correlation_id), result.record if result.found else None
+
+
+def predicates(where):
+    # Predicate messages for (column, condition, operand) tuples that a row must all satisfy:
+    # ('Name', 'eq', 'Item 1'), ('Name', 'any_of', ['Item 1', 'Item 2']), ('Description', 'prefix', 'Desc'),
+    # ('Price', 'range', (10, None)); a None range bound leaves that side open
+    messages = []
+    for column, condition, operand in where:
+        predicate = inventory_pb2.Predicate(column=column)
+        if condition == 'eq':
+            predicate.eq = str(operand)
+        elif condition == 'any_of':
+            predicate.any_of.values.extend(str(value) for value in operand)
+        elif condition == 'prefix':
+            predicate.prefix = str(operand)
+        elif condition == 'range':
+            start, end = operand
+            predicate.range.SetInParent()
+            if start is not None:
+                predicate.range.start = start
+            if end is not None:
+                predicate.range.end = end
+        else:
+            raise ValueError(f"Unknown condition '{condition}'.")
+        messages.append(predicate)
+    return messages
+
+
+def decode_value(value):
+    # A QueryValue as a Python value; None for a missing cell
+    field = value.WhichOneof('value')
+    return getattr(value, field) if field else None
+
+
+def query_request(where=(), columns=(), order_by='', descending=False, limit=0, cursor=''):
+    return inventory_pb2.QueryRequest(where=predicates(where), columns=columns, order_by=order_by,
+                                      descending=descending, limit=limit, cursor=cursor)
+
+
+def query_page(results):
+    # Collects a query stream into ([{column: value}], next_cursor); missing cells come back as None
+    columns = []
+    rows = []
+    next_cursor = ''
+    for result in results:
+        columns = columns or list(result.columns)
+        rows.extend({column: decode_value(value) for column, value in zip(columns, row.values)}
+                    for row in result.rows)
+        next_cursor = result.next_cursor
+    return rows, next_cursor
+
+
+def per_call_options(algorithm):
+    # Stub call keyword arguments for a per-call compression choice; None keeps the pool's setting
+    return call_options(algorithm) if algorithm else {}
+
+
+def query(stub, where=(), columns=(), order_by='', descending=False, limit=0, cursor='', timeout=None,
+          compression=None):
+    # One page of matching rows and the cursor for the next ('' after the last page)
+    return query_page(stub.query(query_request(where, columns, order_by, descending, limit, cursor),
+                                 timeout=timeout, **per_call_options(compression)))
+
+
+def iter_query(stub, where=(), columns=(), order_by='', descending=False, page_size=1000, timeout=None,
+               compression=None):
+    # Every matching row, fetched a page at a time
+    cursor = ''
+    while True:
+        rows, cursor = query(stub, where, columns, order_by, descending, page_size, cursor, timeout, compression)
+        yield from rows
+        if not cursor:
+            return
+
+
+def search_range(stub, key_name, key_value_start, key_value_end, batch_size=0, timeout=None, compression=None):
+    # Records with key_name between the two values. With batch_size, they come batch_size to a message from
+    # searchRangeBatches, which is cheaper per record than one message each; compression ('gzip', 'deflate'
+    # or 'none') overrides the pool's choice for this call.
+    request = inventory_pb2.InventoryRangeRequest(key_name=key_name, key_value_start=str(key_value_start),
+                                                  key_value_end=str(key_value_end), batch_size=batch_size)
+    options = per_call_options(compression)
+    if not batch_size:
+        return list(stub.searchRange(request, timeout=timeout, **options))
+    return [record for batch in stub.searchRangeBatches(request, timeout=timeout, **options)
+            for record in batch.records]
+
+
+def export(stub, columns=(), chunk_rows=0, timeout=None, compression=None):
+    # The whole inventory (or the given columns) as {column: (values, valid)} NumPy arrays, in a fraction of
+    # the time streaming records would take; see columnar.decode_chunks for the types
+    return columnar.decode_chunks(stub.export(inventory_pb2.ExportRequest(columns=columns, chunk_rows=chunk_rows),
+                                              timeout=timeout, **per_call_options(compression)))
+
+
+def export_dataframe(stub, columns=(), chunk_rows=0, timeout=None, compression=None):
+    return columnar.to_dataframe(export(stub, columns, chunk_rows, timeout, compression))
+
+
+def aggregate_request(columns=(), percentiles=(), histogram_buckets=0, group_by='', where=()):
+    return inventory_pb2.AggregateRequest(columns=columns, percentiles=percentiles,
+                                          histogram_buckets=histogram_buckets, group_by=group_by,
+                                          where=predicates(where))
+
+
+def aggregate_groups(response):
+    # ({group_by value: {column: ColumnSummary}}, {column: histogram bucket edges}). The group of rows missing a
+    # group_by value, and the single group when nothing is grouped, are keyed None.
+    return ({decode_value(group.key): {summary.column: summary for summary in group.columns}
+             for group in response.groups},
+            {histogram.column: list(histogram.edges) for histogram in response.histograms})
+
+
+def aggregate(stub, columns=(), percentiles=(), histogram_buckets=0, group_by='', where=(), timeout=None):
+    # Statistics of several numeric columns in one round trip, e.g. the total stock value per Discontinued flag:
+    # aggregate(stub, ['Inventory_Value'], group_by='Discontinued')[0][flag]['Inventory_Value'].sum
+    return aggregate_groups(stub.aggregate(aggregate_request(columns, percentiles, histogram_buckets, group_by, where),
+                                           timeout=timeout))
+
+
+def get_stats(stub):
+    # The server's per-method request counts, status codes and latency percentiles, keyed by method name
+    return {stats.method: stats for stats in stub.getStats(inventory_pb2.StatsRequest()).methods}
+
+
+def set_profiling(stub, sample_rate=None, dump=False, reset=False):
+    # Profile a fraction of the server's calls (0 turns it off; None leaves it as is) and optionally write
+    # what has been gathered to files on the server; returns the ProfilingResponse with those file names
+    request = inventory_pb2.ProfilingRequest(dump=dump, reset=reset)
+    if sample_rate is not None:
+        request.sample_rate = sample_rate
+    return stub.setProfiling(request)
+
+
+class RecordCache:
+    # searchByID answers kept on the client, evicting the least recently used beyond maxsize.
+    # A watchChanges stream to each server in the pool evicts rows as updates change them. Nothing is served
+    # unless every stream is live, and a stream that breaks empties the cache, so changes missed while it was
+    # down can't leave stale records behind. A prefork server sends a change's event only once every worker
+    # has applied it, so watching whichever worker a stream lands on is enough. Cached records are shared
+    # between callers: treat them as read-only.
+
+    def __init__(self, pool, maxsize):
+        self.entries = LRUCache(maxsize)
+        self.lock = threading.Lock()
+        # Bumped by every invalidation, so a lookup that raced with one isn't cached
+        self.version = 0
+        self.live = set()
+        self.addresses = pool.addresses
+        self.calls = {}
+        self.closed = False
+        # pool.stubs starts with one channel to each address
+        for address, stub in zip(pool.addresses, pool.stubs):
+            threading.Thread(target=self.watch, args=(address, stub), name=f'watch-{address}', daemon=True).start()
+
+    def get(self, inventory_id):
+        if len(self.live) < len(self.addresses):
+            return None
+        return self.entries.get(inventory_id)
+
+    def put(self, inventory_id, record, version):
+        with self.lock:
+            if version == self.version and len(self.live) == len(self.addresses):
+                self.entries.put(inventory_id, record)
+
+    def invalidate(self, inventory_ids):
+        with self.lock:
+            self.version += 1
+            for inventory_id in inventory_ids:
+                self.entries.pop(inventory_id)
+
+    def clear(self):
+        with self.lock:
+            self.version += 1
+            self.entries.clear()
+
+    def watch(self, address, stub):
+        while not self.closed:
+            call = self.calls[address] = stub.watchChanges(inventory_pb2.WatchRequest(), wait_for_ready=True)
+            try:
+                for event in call:
+                    if event.inventory_ids:
+                        self.invalidate(event.inventory_ids)
+                    else:
+                        # The server sends an empty event once the subscription is live
+                        with self.lock:
+                            self.live.add(address)
+            except grpc.RpcError:
+                pass
+            with self.lock:
+                self.live.discard(address)
+            self.clear()
+            if not self.closed:
+                time.sleep(WATCH_RETRY_INTERVAL)
+
+    def forget_update(self, key_name, key_value, val_name, val_val_new):
+        # Drop what an update made through this client may have changed, without waiting for its event
+        if key_name != 'Inventory_ID':
+            self.clear()
+        else:
+            self.invalidate([key_value, val_val_new] if val_name == 'Inventory_ID' else [key_value])
+
+    def close(self):
+        self.closed = True
+        for call in list(self.calls.values()):
+            call.cancel()
+
+
+def record_cache(pool, cache):
+    # cache is a RecordCache to share, a size for a new one, or None/0 for no caching
+    if cache is None or isinstance(cache, RecordCache):
+        return cache
+    return RecordCache(pool, cache) if cache else None
+
+
+class InventoryClient:
+    # Blocking client; pass addresses, or a ChannelPool to share its channels with other clients.
+    # With cache, searchByID answers are kept locally (see RecordCache).
+
+    def __init__(self, addresses, timeout=None, cache=None):
+        self.pool = addresses if isinstance(addresses, ChannelPool) else ChannelPool(addresses)
+        self.stub = self.pool.stub()
+        self.timeout = timeout
+        self.cache = record_cache(self.pool, cache)
+
+    def search_by_id(self, inventory_id):
+        if self.cache is None:
+            return self.stub.searchByID(inventory_pb2.InventoryRequest(id=inventory_id), timeout=self.timeout)
+        record = self.cache.get(inventory_id)
+        if record is None:
+            version = self.cache.version
+            record = self.stub.searchByID(inventory_pb2.InventoryRequest(id=inventory_id), timeout=self.timeout)
+            self.cache.put(inventory_id, record, version)
+        return record
+
+    def search(self, key_name, key_value):
+        return self.stub.search(inventory_pb2.InventorySearchRequest(key_name=key_name, key_value=key_value),
+                                timeout=self.timeout)
+
+    def search_range(self, key_name, key_value_start, key_value_end, batch_size=0, compression=None):
+        return search_range(self.stub, key_name, key_value_start, key_value_end, batch_size, self.timeout,
+                            compression)
+
+    def get_distribution(self, key_name, percentile):
+        return self.stub.getDistribution(inventory_pb2.DistributionRequest(key_name=key_name, percentile=percentile),
+                                         timeout=self.timeout).value
+
+    def update(self, key_name, key_value, val_name, val_val_new):
+        try:
+            return self.stub.update(inventory_pb2.UpdateRequest(key_name=key_name, key_value=key_value,
+                                                                val_name=val_name, val_val_new=str(val_val_new)),
+                                    timeout=self.timeout).success
+        finally:
+            if self.cache is not None:
+                self.cache.forget_update(key_name, key_value, val_name, str(val_val_new))
+
+    def batch_search_by_id(self, inventory_ids):
+        return batch_search_by_id(self.stub, inventory_ids)
+
+    def bulk_update(self, updates):
+        try:
+            return bulk_update(self.stub, updates)
+        finally:
+            if self.cache is not None:
+                for update in updates:
+                    self.cache.forget_update(*update)
+
+    def stream_search_by_id(self, inventory_ids):
+        return stream_search_by_id(self.stub, inventory_ids)
+
+    def query(self, where=(), columns=(), order_by='', descending=False, limit=0, cursor='', compression=None):
+        return query(self.stub, where, columns, order_by, descending, limit, cursor, self.timeout, compression)
+
+    def iter_query(self, where=(), columns=(), order_by='', descending=False, page_size=1000, compression=None):
+        return iter_query(self.stub, where, columns, order_by, descending, page_size, self.timeout, compression)
+
+    def aggregate(self, columns=(), percentiles=(), histogram_buckets=0, group_by='', where=()):
+        return aggregate(self.stub, columns, percentiles, histogram_buckets, group_by, where, self.timeout)
+
+    def export(self, columns=(), chunk_rows=0, compression=None):
+        return export(self.stub, columns, chunk_rows, self.timeout, compression)
+
+    def export_dataframe(self, columns=(), chunk_rows=0, compression=None):
+        return export_dataframe(self.stub, columns, chunk_rows, self.timeout, compression)
+
+    def get_stats(self):
+        return get_stats(self.stub)
+
+    def close(self):
+        if self.cache is not None:
+            self.cache.close()
+        self.pool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class AsyncInventoryClient:
+    # asyncio client; give it the same ChannelPool as an InventoryClient to share the configuration and turns,
+    # and its cache to share cached records
+
+    def __init__(self, addresses, timeout=None, cache=None):
+        self.pool = addresses if isinstance(addresses, ChannelPool) else ChannelPool(addresses)
+        self.stub = self.pool.aio_stub()
+        self.timeout = timeout
+        self.cache = record_cache(self.pool, cache)
+
+    async def search_by_id(self, inventory_id):
+        if self.cache is None:
+            return await self.stub.searchByID(inventory_pb2.InventoryRequest(id=inventory_id), timeout=self.timeout)
+        record = self.cache.get(inventory_id)
+        if record is None:
+            version = self.cache.version
+            record = await self.stub.searchByID(inventory_pb2.InventoryRequest(id=inventory_id),
+                                                timeout=self.timeout)
+            self.cache.put(inventory_id, record, version)
+        return record
+
+    async def search(self, key_name, key_value):
+        return await self.stub.search(inventory_pb2.InventorySearchRequest(key_name=key_name, key_value=key_value),
+                                      timeout=self.timeout)
+
+    async def search_range(self, key_name, key_value_start, key_value_end, batch_size=0, compression=None):
+        request = inventory_pb2.InventoryRangeRequest(key_name=key_name, key_value_start=str(key_value_start),
+                                                      key_value_end=str(key_value_end), batch_size=batch_size)
+        options = per_call_options(compression)
+        if not batch_size:
+            return [record async for record in self.stub.searchRange(request, timeout=self.timeout, **options)]
+        call = self.stub.searchRangeBatches(request, timeout=self.timeout, **options)
+        return [record async for batch in call for record in batch.records]
+
+    async def get_distribution(self, key_name, percentile):
+        response = await self.stub.getDistribution(
+            inventory_pb2.DistributionRequest(key_name=key_name, percentile=percentile), timeout=self.timeout)
+        return response.value
+
+    async def update(self, key_name, key_value, val_name, val_val_new):
+        try:
+            response = await self.stub.update(inventory_pb2.UpdateRequest(
+                key_name=key_name, key_value=key_value, val_name=val_name, val_val_new=str(val_val_new)),
+                timeout=self.timeout)
+            return response.success
+        finally:
+            if self.cache is not None:
+                self.cache.forget_update(key_name, key_value, val_name, str(val_val_new))
+
+    async def batch_search_by_id(self, inventory_ids):
+        response = await self.stub.batchSearchByID(inventory_pb2.InventoryBatchRequest(ids=inventory_ids),
+                                                   timeout=self.timeout)
+        return {inventory_id: record for inventory_id, record in zip(inventory_ids, response.records)
+                if record.Inventory_ID}
+
+    async def query(self, where=(), columns=(), order_by='', descending=False, limit=0, cursor='', compression=None):
+        call = self.stub.query(query_request(where, columns, order_by, descending, limit, cursor),
+                               timeout=self.timeout, **per_call_options(compression))
+        return query_page([result async for result in call])
+
+    async def aggregate(self, columns=(), percentiles=(), histogram_buckets=0, group_by='', where=()):
+        response = await self.stub.aggregate(aggregate_request(columns, percentiles, histogram_buckets, group_by,
+                                                               where), timeout=self.timeout)
+        return aggregate_groups(response)
+
+    async def export(self, columns=(), chunk_rows=0, compression=None):
+        call = self.stub.export(inventory_pb2.ExportRequest(columns=columns, chunk_rows=chunk_rows),
+                                timeout=self.timeout, **per_call_options(compression))
+        return columnar.decode_chunks([chunk async for chunk in call])
+
+    async def export_dataframe(self, columns=(), chunk_rows=0, compression=None):
+        return columnar.to_dataframe(await self.export(columns, chunk_rows, compression))
+
+    async def get_stats(self):
+        response = await self.stub.getStats(inventory_pb2.StatsRequest(), timeout=self.timeout)
+        return {stats.method: stats for stats in response.methods}
+
+    async def close(self):
+        await self.pool.close_aio()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
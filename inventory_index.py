@@ -0,0 +1,336 @@
+import math
+import zlib
+import numpy as np
+
+# Indexes over the ColumnStore, kept as NumPy arrays of row positions and category codes rather than
+# Python lists and dicts per row, so they cost a few bytes per row on top of the data. Snapshots save
+# those arrays (arrays()) and a loaded store gets its indexes back from them (load()) instead of
+# building them again.
+
+
+def normalize_key(value):
+    # search() compares values as strings with any leading dollar sign removed
+    return str(value).lstrip('$')
+
+
+def key_hash(value):
+    # Unlike hash(), the same in every process
+    return zlib.crc32(value.encode('utf-8', 'surrogatepass'))
+
+
+def column_codes(store, column):
+    # Whether column is an interned column of store, which the code-based indexes need
+    return column in store and not store.is_numeric(column)
+
+
+class KeyTable:
+    # Exact-match lookup from an interned column's text categories to their codes: an open-addressing hash
+    # table whose int32 slots hold code + 1 (0 for empty), probed forwards from slot key_hash & mask. The
+    # slots run past mask so no probe wraps around, and end empty. Categories interned after it was built
+    # are kept in a dict.
+
+    def __init__(self, slots, mask):
+        self.slots = slots
+        self.mask = mask
+        self.added = {}
+
+    @classmethod
+    def build(cls, categories):
+        try:
+            hashes = np.fromiter(map(zlib.crc32, map(str.encode, categories)), dtype=np.int64, count=len(categories))
+            codes = np.arange(len(categories))
+        except (TypeError, UnicodeEncodeError):
+            # Not every category is plain text
+            hashes = np.fromiter((key_hash(value) if isinstance(value, str) else -1 for value in categories),
+                                 dtype=np.int64, count=len(categories))
+            codes = np.flatnonzero(hashes >= 0)
+        size = 8
+        while size < 2 * len(codes):
+            size *= 2
+        # Filled in order of home slot, each key takes the first slot after the previous key's that isn't
+        # before its own home
+        homes = hashes[codes] & (size - 1)
+        order = np.argsort(homes)
+        offsets = np.arange(len(codes))
+        places = np.maximum.accumulate(homes[order] - offsets) + offsets if len(codes) else offsets
+        slots = np.zeros(max(size, int(places[-1]) + 1 if len(codes) else 0) + 1, dtype=np.int32)
+        slots[places] = codes[order] + 1
+        return cls(slots, size - 1)
+
+    def get(self, categories, value):
+        # value's code in categories, the list the table was built from, or None
+        if not isinstance(value, str):
+            return None
+        place = key_hash(value) & self.mask
+        while True:
+            code = int(self.slots[place]) - 1
+            if code < 0:
+                return self.added.get(value)
+            if categories[code] == value:
+                return code
+            place += 1
+
+    def add(self, value, code):
+        if isinstance(value, str):
+            self.added[value] = code
+
+
+class IdIndex:
+    # Primary-key index: for each code of the interned ID column, the first row holding it (-1 if none) and
+    # how many rows hold it. The first occurrence wins, matching the old linear search behaviour.
+
+    def __init__(self, column):
+        self.column = column
+        self.store = None
+        self.first_rows = np.zeros(0, dtype=np.int64)
+        self.counts = np.zeros(0, dtype=np.int64)
+
+    def build(self, store):
+        self.store = store
+        self.first_rows = np.zeros(0, dtype=np.int64)
+        self.counts = np.zeros(0, dtype=np.int64)
+        if column_codes(store, self.column):
+            # Every lookup goes through the column's KeyTable, so build it now rather than on the first one
+            store.key_table(self.column)
+            codes, valid = store.cells(self.column)
+            rows = np.flatnonzero(valid)
+            present, first = np.unique(codes[rows], return_index=True)
+            self.first_rows = np.full(len(store.categories[self.column]), -1, dtype=np.int64)
+            self.first_rows[present] = rows[first]
+            self.counts = np.bincount(codes[rows], minlength=len(self.first_rows)).astype(np.int64)
+        return self
+
+    def arrays(self):
+        return {'first_rows': self.first_rows, 'counts': self.counts}
+
+    def load(self, store, arrays):
+        self.store = store
+        self.first_rows = arrays['first_rows']
+        self.counts = arrays['counts']
+        return self
+
+    def get(self, value):
+        code = self.store.code_of(self.column, value)
+        if code is None or code >= len(self.first_rows) or self.first_rows[code] < 0:
+            return None
+        return int(self.first_rows[code])
+
+    def first(self, value):
+        # As HashIndex.first: the first row whose normalized value equals value's
+        matches = self.lookup(value)
+        return int(matches[0]) if len(matches) else None
+
+    def lookup(self, value):
+        # Row positions whose normalized value equals value's, in row order, as HashIndex.lookup. IDs are
+        # normally unique, so this is one row per matching code; only duplicates and missing cells are
+        # looked for in the column itself.
+        key = normalize_key(value)
+        codes, valid = self.store.cells(self.column)
+        parts = [np.flatnonzero(~valid)] if key == 'nan' else []
+        for code in self.store.normalized_codes(self.column, key):
+            if code >= len(self.counts) or not self.counts[code]:
+                continue
+            if self.counts[code] == 1:
+                parts.append(self.first_rows[code:code + 1])
+            else:
+                parts.append(np.flatnonzero((codes == code) & valid))
+        if len(parts) == 1:
+            return parts[0]
+        return np.sort(np.concatenate(parts)) if parts else np.zeros(0, dtype=np.int64)
+
+    def move(self, index, old_code, new_code):
+        # Row index now holds new_code instead of old_code (-1 for a missing cell)
+        if old_code == new_code:
+            return
+        if new_code >= len(self.first_rows):
+            grown = new_code + 1 - len(self.first_rows)
+            self.first_rows = np.concatenate((self.first_rows, np.full(grown, -1, dtype=np.int64)))
+            self.counts = np.concatenate((self.counts, np.zeros(grown, dtype=np.int64)))
+        if old_code >= 0:
+            self.counts[old_code] -= 1
+            if not self.counts[old_code]:
+                self.first_rows[old_code] = -1
+            elif self.first_rows[old_code] == index:
+                codes, valid = self.store.cells(self.column)
+                self.first_rows[old_code] = int(((codes == old_code) & valid).argmax())
+        if new_code >= 0:
+            self.counts[new_code] += 1
+            if not 0 <= self.first_rows[new_code] < index:
+                self.first_rows[new_code] = index
+
+
+class HashIndex:
+    # Secondary index for one interned column: every row position grouped by category code, CSR style.
+    # Group 0 holds the rows whose cell is missing and group code + 1 the rows holding that category, each
+    # in row order as order[starts[group]:starts[group + 1]]. The store says which codes a key stands for.
+
+    def __init__(self, column):
+        self.column = column
+        self.store = None
+        self.order = np.zeros(0, dtype=np.int64)
+        self.starts = np.zeros(1, dtype=np.int64)
+
+    def build(self, store):
+        self.store = store
+        codes, valid = store.cells(self.column)
+        groups = np.where(valid, codes.astype(np.int64) + 1, 0)
+        # A stable sort keeps each group in row order
+        self.order = np.argsort(groups, kind='stable')
+        counts = np.bincount(groups, minlength=len(store.categories[self.column]) + 1)
+        self.starts = np.concatenate(([0], np.cumsum(counts)))
+        # Likewise for what lookups need from the store
+        store.key_table(self.column)
+        store.aliases(self.column)
+        return self
+
+    def arrays(self):
+        return {'order': self.order, 'starts': self.starts}
+
+    def load(self, store, arrays):
+        self.store = store
+        self.order = arrays['order']
+        self.starts = arrays['starts']
+        store.key_table(self.column)
+        store.aliases(self.column)
+        return self
+
+    def lookup(self, value):
+        # Row positions whose normalized value equals value's, in row order. May be a view of the index:
+        # use it under the lock it was looked up under.
+        key = normalize_key(value)
+        groups = [code + 1 for code in self.store.normalized_codes(self.column, key)]
+        if key == 'nan':
+            groups.append(0)
+        parts = [self.order[self.starts[group]:self.starts[group + 1]] for group in groups
+                 if group + 1 < len(self.starts)]
+        if len(parts) == 1:
+            return parts[0]
+        return np.sort(np.concatenate(parts)) if parts else np.zeros(0, dtype=np.int64)
+
+    def first(self, value):
+        matches = self.lookup(value)
+        return int(matches[0]) if len(matches) else None
+
+    def move(self, index, old_code, new_code):
+        # Row index now holds new_code instead of old_code (-1 for a missing cell). The rows between the
+        # two groups shift one place in order and the group boundaries between them move with them.
+        source, target = old_code + 1, new_code + 1
+        if source == target:
+            return
+        if target + 1 >= len(self.starts):
+            # Categories interned since the index was built start out with no rows
+            self.starts = np.concatenate((self.starts, np.full(target + 2 - len(self.starts), self.starts[-1])))
+        position = self.starts[source] + np.searchsorted(self.order[self.starts[source]:self.starts[source + 1]], index)
+        insert = self.starts[target] + np.searchsorted(self.order[self.starts[target]:self.starts[target + 1]], index)
+        if source < target:
+            insert -= 1
+            self.order[position:insert] = self.order[position + 1:insert + 1]
+            self.starts[source + 1:target + 1] -= 1
+        else:
+            self.order[insert + 1:position + 1] = self.order[insert:position]
+            self.starts[target + 1:source + 1] += 1
+        self.order[insert] = index
+
+
+def range_key(value):
+    # searchRange only considers numeric cells; anything else (including NaN) stays out of the index
+    if isinstance(value, (int, float)) and not (isinstance(value, float) and math.isnan(value)):
+        return float(value)
+    return None
+
+
+class SortedIndex:
+    # Numeric index for one column: parallel arrays of values and row positions ordered by (value, position)
+
+    def __init__(self, column):
+        self.column = column
+        self.keys = np.zeros(0, dtype=np.float64)
+        self.positions = np.zeros(0, dtype=np.int64)
+
+    def build(self, store):
+        self.keys = np.zeros(0, dtype=np.float64)
+        self.positions = np.zeros(0, dtype=np.int64)
+        view = store.numeric_view(self.column)
+        if view is not None:
+            values, mask = view
+            positions = np.flatnonzero(mask)
+            # A stable sort keeps equal values in row order
+            order = np.argsort(values[positions], kind='stable')
+            self.keys = values[positions][order].astype(np.float64)
+            self.positions = positions[order]
+        return self
+
+    def arrays(self):
+        return {'keys': self.keys, 'positions': self.positions}
+
+    def load(self, store, arrays):
+        self.keys = arrays['keys']
+        self.positions = arrays['positions']
+        return self
+
+    def between(self, start, end):
+        # Row positions with start <= value <= end: two binary searches and a slice, copied so later
+        # updates can't shift it
+        low = np.searchsorted(self.keys, start, side='left')
+        high = np.searchsorted(self.keys, end, side='right')
+        return self.positions[low:high].copy()
+
+    def count(self, start, end):
+        return int(np.searchsorted(self.keys, end, side='right') - np.searchsorted(self.keys, start, side='left'))
+
+    def percentile(self, percentile):
+        # Linear interpolation between closest ranks, as numpy.percentile does, read straight off the
+        # sorted values. Returns None when the column holds no numeric values.
+        if not len(self.keys):
+            return None
+        rank = (len(self.keys) - 1) * percentile / 100.0
+        low = math.floor(rank)
+        high = min(low + 1, len(self.keys) - 1)
+        fraction = rank - low
+        return float(self.keys[low] + (self.keys[high] - self.keys[low]) * fraction)
+
+    def locate(self, key, index):
+        # Offset where (key, index) sits, or should be inserted, within the run of equal keys
+        low = np.searchsorted(self.keys, key, side='left')
+        high = np.searchsorted(self.keys, key, side='right')
+        return int(low + np.searchsorted(self.positions[low:high], index))
+
+    def found(self, offset, key, index):
+        return offset < len(self.keys) and self.keys[offset] == key and self.positions[offset] == index
+
+    def add(self, index, value):
+        key = range_key(value)
+        if key is None:
+            return
+        offset = self.locate(key, index)
+        self.keys = np.insert(self.keys, offset, key)
+        self.positions = np.insert(self.positions, offset, index)
+
+    def remove(self, index, value):
+        key = range_key(value)
+        if key is None:
+            return
+        offset = self.locate(key, index)
+        if self.found(offset, key, index):
+            self.keys = np.delete(self.keys, offset)
+            self.positions = np.delete(self.positions, offset)
+
+    def move(self, index, old_value, new_value):
+        # Row index's value changed. Between two numbers the entries in between shift one place in place;
+        # a cell that became or stopped being a number is removed or inserted.
+        old_key, new_key = range_key(old_value), range_key(new_value)
+        offset = self.locate(old_key, index) if old_key is not None else None
+        if new_key is None or offset is None or not self.found(offset, old_key, index):
+            self.remove(index, old_value)
+            self.add(index, new_value)
+            return
+        target = self.locate(new_key, index)
+        if target > offset:
+            target -= 1
+            self.keys[offset:target] = self.keys[offset + 1:target + 1]
+            self.positions[offset:target] = self.positions[offset + 1:target + 1]
+        else:
+            self.keys[target + 1:offset + 1] = self.keys[target:offset]
+            self.positions[target + 1:offset + 1] = self.positions[target:offset]
+        self.keys[target] = new_key
+        self.positions[target] = index
@@ -13,29 +13,87 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0finventory.proto\x12\x05unary\"\xd7\x01\n\x0fInventoryRecord\x12\x14\n\x0cInventory_ID\x18\x01 \x01(\t\x12\x0c\n\x04Name\x18\x02 \x01(\t\x12\x13\n\x0b\x44\x65scription\x18\x03 \x01(\t\x12\r\n\x05Price\x18\x04 \x01(\x01\x12\x19\n\x11Quantity_in_Stock\x18\x05 \x01(\x05\x12\x17\n\x0fInventory_Value\x18\x06 \x01(\x05\x12\x15\n\rReorder_Level\x18\x07 \x01(\x05\x12\x1b\n\x13Quantity_in_Reorder\x18\x08 \x01(\x05\x12\x14\n\x0c\x44iscontinued\x18\t \x01(\x08\"\x1e\n\x10InventoryRequest\x12\n\n\x02id\x18\x01 \x01(\t\"=\n\x16InventorySearchRequest\x12\x10\n\x08key_name\x18\x01 \x01(\t\x12\x11\n\tkey_value\x18\x02 \x01(\t\"Y\n\x15InventoryRangeRequest\x12\x10\n\x08key_name\x18\x01 \x01(\t\x12\x17\n\x0fkey_value_start\x18\x02 \x01(\t\x12\x15\n\rkey_value_end\x18\x03 \x01(\t\";\n\x13\x44istributionRequest\x12\x10\n\x08key_name\x18\x01 \x01(\t\x12\x12\n\npercentile\x18\x02 \x01(\x01\"[\n\rUpdateRequest\x12\x10\n\x08key_name\x18\x01 \x01(\t\x12\x11\n\tkey_value\x18\x02 \x01(\t\x12\x10\n\x08val_name\x18\x03 \x01(\t\x12\x13\n\x0bval_val_new\x18\x04 \x01(\t\"%\n\x14\x44istributionResponse\x12\r\n\x05value\x18\x01 \x01(\x01\"!\n\x0eUpdateResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x32\xdc\x02\n\x10InventoryService\x12=\n\nsearchByID\x12\x17.unary.InventoryRequest\x1a\x16.unary.InventoryRecord\x12?\n\x06search\x12\x1d.unary.InventorySearchRequest\x1a\x16.unary.InventoryRecord\x12\x45\n\x0bsearchRange\x12\x1c.unary.InventoryRangeRequest\x1a\x16.unary.InventoryRecord0\x01\x12J\n\x0fgetDistribution\x12\x1a.unary.DistributionRequest\x1a\x1b.unary.DistributionResponse\x12\x35\n\x06update\x12\x14.unary.UpdateRequest\x1a\x15.unary.UpdateResponseb\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0finventory.proto\x12\x05unary\"\xd7\x01\n\x0fInventoryRecord\x12\x14\n\x0cInventory_ID\x18\x01 \x01(\t\x12\x0c\n\x04Name\x18\x02 \x01(\t\x12\x13\n\x0b\x44\x65scription\x18\x03 \x01(\t\x12\r\n\x05Price\x18\x04 \x01(\x01\x12\x19\n\x11Quantity_in_Stock\x18\x05 \x01(\x05\x12\x17\n\x0fInventory_Value\x18\x06 \x01(\x05\x12\x15\n\rReorder_Level\x18\x07 \x01(\x05\x12\x1b\n\x13Quantity_in_Reorder\x18\x08 \x01(\x05\x12\x14\n\x0c\x44iscontinued\x18\t \x01(\x08\"6\n\x10InventoryRequest\x12\n\n\x02id\x18\x01 \x01(\t\x12\x16\n\x0e\x63orrelation_id\x18\x02 \x01(\t\"=\n\x16InventorySearchRequest\x12\x10\n\x08key_name\x18\x01 \x01(\t\x12\x11\n\tkey_value\x18\x02 \x01(\t\"m\n\x15InventoryRangeRequest\x12\x10\n\x08key_name\x18\x01 \x01(\t\x12\x17\n\x0fkey_value_start\x18\x02 \x01(\t\x12\x15\n\rkey_value_end\x18\x03 \x01(\t\x12\x12\n\nbatch_size\x18\x04 \x01(\x05\";\n\x13\x44istributionRequest\x12\x10\n\x08key_name\x18\x01 \x01(\t\x12\x12\n\npercentile\x18\x02 \x01(\x01\"[\n\rUpdateRequest\x12\x10\n\x08key_name\x18\x01 \x01(\t\x12\x11\n\tkey_value\x18\x02 \x01(\t\x12\x10\n\x08val_name\x18\x03 \x01(\t\x12\x13\n\x0bval_val_new\x18\x04 \x01(\t\"$\n\x15InventoryBatchRequest\x12\x0b\n\x03ids\x18\x01 \x03(\t\";\n\x10InventoryRecords\x12\'\n\x07records\x18\x01 \x03(\x0b\x32\x16.unary.InventoryRecord\"f\n\x15InventoryLookupResult\x12\x16\n\x0e\x63orrelation_id\x18\x01 \x01(\t\x12\r\n\x05\x66ound\x18\x02 \x01(\x08\x12&\n\x06record\x18\x03 \x01(\x0b\x32\x16.unary.InventoryRecord\":\n\x11\x42ulkUpdateRequest\x12%\n\x07updates\x18\x01 \x03(\x0b\x32\x14.unary.UpdateRequest\"%\n\x14\x44istributionResponse\x12\r\n\x05value\x18\x01 \x01(\x01\"!\n\x0eUpdateResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\"\x0e\n\x0cStatsRequest\"6\n\rLatencyBucket\x12\x16\n\x0eupper_bound_ms\x18\x01 \x01(\x01\x12\r\n\x05\x63ount\x18\x02 \x01(\x03\"\xba\x02\n\x0bMethodStats\x12\x0e\n\x06method\x18\x01 \x01(\t\x12\x10\n\x08requests\x18\x02 \x01(\x03\x12\x11\n\tin_flight\x18\x03 \x01(\x03\x12\x39\n\x0cstatus_codes\x18\x04 \x03(\x0b\x32#.unary.MethodStats.StatusCodesEntry\x12\x0f\n\x07mean_ms\x18\x05 \x01(\x01\x12\x0e\n\x06max_ms\x18\x06 \x01(\x01\x12\x0e\n\x06p50_ms\x18\x07 \x01(\x01\x12\x0e\n\x06p90_ms\x18\x08 \x01(\x01\x12\x0e\n\x06p99_ms\x18\t \x01(\x01\x12\x0f\n\x07p999_ms\x18\n \x01(\x01\x12%\n\x07\x62uckets\x18\x0b \x03(\x0b\x32\x14.unary.LatencyBucket\x1a\x32\n\x10StatusCodesEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\x03:\x02\x38\x01\"O\n\x0fQueryCacheStats\x12\x0c\n\x04hits\x18\x01 \x01(\x03\x12\x0e\n\x06misses\x18\x02 \x01(\x03\x12\r\n\x05stale\x18\x03 \x01(\x03\x12\x0f\n\x07\x65ntries\x18\x04 \x01(\x03\"w\n\x0bServerStats\x12\x16\n\x0euptime_seconds\x18\x01 \x01(\x01\x12#\n\x07methods\x18\x02 \x03(\x0b\x32\x12.unary.MethodStats\x12+\n\x0bquery_cache\x18\x03 \x01(\x0b\x32\x16.unary.QueryCacheStats\"\x0e\n\x0cWatchRequest\"F\n\x0b\x43hangeEvent\x12\x10\n\x08sequence\x18\x01 \x01(\x03\x12\x15\n\rinventory_ids\x18\x02 \x03(\t\x12\x0e\n\x06\x63olumn\x18\x03 \x01(\t\"Y\n\x10ProfilingRequest\x12\x18\n\x0bsample_rate\x18\x01 \x01(\x01H\x00\x88\x01\x01\x12\x0c\n\x04\x64ump\x18\x02 \x01(\x08\x12\r\n\x05reset\x18\x03 \x01(\x08\x42\x0e\n\x0c_sample_rate\"O\n\x11ProfilingResponse\x12\x13\n\x0bsample_rate\x18\x01 \x01(\x01\x12\x16\n\x0eprofiled_calls\x18\x02 \x01(\x03\x12\r\n\x05\x66iles\x18\x03 \x03(\t\"D\n\nValueRange\x12\x12\n\x05start\x18\x01 \x01(\x01H\x00\x88\x01\x01\x12\x10\n\x03\x65nd\x18\x02 \x01(\x01H\x01\x88\x01\x01\x42\x08\n\x06_startB\x06\n\x04_end\"\x1b\n\tValueList\x12\x0e\n\x06values\x18\x01 \x03(\t\"\x90\x01\n\tPredicate\x12\x0e\n\x06\x63olumn\x18\x01 \x01(\t\x12\x0c\n\x02\x65q\x18\x02 \x01(\tH\x00\x12\"\n\x06\x61ny_of\x18\x03 \x01(\x0b\x32\x10.unary.ValueListH\x00\x12\"\n\x05range\x18\x04 \x01(\x0b\x32\x11.unary.ValueRangeH\x00\x12\x10\n\x06prefix\x18\x05 \x01(\tH\x00\x42\x0b\n\tcondition\"\x85\x01\n\x0cQueryRequest\x12\x1f\n\x05where\x18\x01 \x03(\x0b\x32\x10.unary.Predicate\x12\x0f\n\x07\x63olumns\x18\x02 \x03(\t\x12\x10\n\x08order_by\x18\x03 \x01(\t\x12\x12\n\ndescending\x18\x04 \x01(\x08\x12\r\n\x05limit\x18\x05 \x01(\x05\x12\x0e\n\x06\x63ursor\x18\x06 \x01(\t\"J\n\nQueryValue\x12\x0e\n\x04text\x18\x01 \x01(\tH\x00\x12\x10\n\x06number\x18\x02 \x01(\x01H\x00\x12\x11\n\x07integer\x18\x03 \x01(\x03H\x00\x42\x07\n\x05value\"-\n\x08QueryRow\x12!\n\x06values\x18\x01 \x03(\x0b\x32\x11.unary.QueryValue\"`\n\x0bQueryResult\x12\x0f\n\x07\x63olumns\x18\x01 \x03(\t\x12\x0c\n\x04plan\x18\x02 \x01(\t\x12\x1d\n\x04rows\x18\x03 \x03(\x0b\x32\x0f.unary.QueryRow\x12\x13\n\x0bnext_cursor\x18\x04 \x01(\t\"\x86\x01\n\x10\x41ggregateRequest\x12\x0f\n\x07\x63olumns\x18\x01 \x03(\t\x12\x13\n\x0bpercentiles\x18\x02 \x03(\x01\x12\x19\n\x11histogram_buckets\x18\x03 \x01(\x05\x12\x10\n\x08group_by\x18\x04 \x01(\t\x12\x1f\n\x05where\x18\x05 \x03(\x0b\x32\x10.unary.Predicate\"\x8b\x01\n\rColumnSummary\x12\x0e\n\x06\x63olumn\x18\x01 \x01(\t\x12\r\n\x05\x63ount\x18\x02 \x01(\x03\x12\x0b\n\x03sum\x18\x03 \x01(\x01\x12\x0b\n\x03min\x18\x04 \x01(\x01\x12\x0b\n\x03max\x18\x05 \x01(\x01\x12\x0c\n\x04mean\x18\x06 \x01(\x01\x12\x13\n\x0bpercentiles\x18\x07 \x03(\x01\x12\x11\n\thistogram\x18\x08 \x03(\x03\"e\n\x0e\x41ggregateGroup\x12\x1e\n\x03key\x18\x01 \x01(\x0b\x32\x11.unary.QueryValue\x12\x0c\n\x04rows\x18\x02 \x01(\x03\x12%\n\x07\x63olumns\x18\x03 \x03(\x0b\x32\x14.unary.ColumnSummary\"*\n\tHistogram\x12\x0e\n\x06\x63olumn\x18\x01 \x01(\t\x12\r\n\x05\x65\x64ges\x18\x02 \x03(\x01\"`\n\x11\x41ggregateResponse\x12%\n\x06groups\x18\x01 \x03(\x0b\x32\x15.unary.AggregateGroup\x12$\n\nhistograms\x18\x02 \x03(\x0b\x32\x10.unary.Histogram\"4\n\rExportRequest\x12\x0f\n\x07\x63olumns\x18\x01 \x03(\t\x12\x12\n\nchunk_rows\x18\x02 \x01(\x05\"\x8f\x01\n\x0b\x43olumnChunk\x12\x0e\n\x06\x63olumn\x18\x01 \x01(\t\x12\x11\n\tstart_row\x18\x02 \x01(\x03\x12\x0c\n\x04rows\x18\x03 \x01(\x03\x12\r\n\x05\x64type\x18\x04 \x01(\t\x12\x0e\n\x06values\x18\x05 \x01(\x0c\x12\r\n\x05valid\x18\x06 \x01(\x0c\x12\r\n\x05\x63oded\x18\x07 \x01(\x08\x12\x12\n\ndictionary\x18\x08 \x03(\t2\xe0\x07\n\x10InventoryService\x12=\n\nsearchByID\x12\x17.unary.InventoryRequest\x1a\x16.unary.InventoryRecord\x12?\n\x06search\x12\x1d.unary.InventorySearchRequest\x1a\x16.unary.InventoryRecord\x12\x45\n\x0bsearchRange\x12\x1c.unary.InventoryRangeRequest\x1a\x16.unary.InventoryRecord0\x01\x12M\n\x12searchRangeBatches\x12\x1c.unary.InventoryRangeRequest\x1a\x17.unary.InventoryRecords0\x01\x12J\n\x0fgetDistribution\x12\x1a.unary.DistributionRequest\x1a\x1b.unary.DistributionResponse\x12\x35\n\x06update\x12\x14.unary.UpdateRequest\x1a\x15.unary.UpdateResponse\x12H\n\x0f\x62\x61tchSearchByID\x12\x1c.unary.InventoryBatchRequest\x1a\x17.unary.InventoryRecords\x12=\n\nbulkUpdate\x12\x18.unary.BulkUpdateRequest\x1a\x15.unary.UpdateResponse\x12M\n\x10searchByIDStream\x12\x17.unary.InventoryRequest\x1a\x1c.unary.InventoryLookupResult(\x01\x30\x01\x12\x33\n\x08getStats\x12\x13.unary.StatsRequest\x1a\x12.unary.ServerStats\x12\x41\n\x0csetProfiling\x12\x17.unary.ProfilingRequest\x1a\x18.unary.ProfilingResponse\x12\x39\n\x0cwatchChanges\x12\x13.unary.WatchRequest\x1a\x12.unary.ChangeEvent0\x01\x12\x32\n\x05query\x12\x13.unary.QueryRequest\x1a\x12.unary.QueryResult0\x01\x12>\n\taggregate\x12\x17.unary.AggregateRequest\x1a\x18.unary.AggregateResponse\x12\x34\n\x06\x65xport\x12\x14.unary.ExportRequest\x1a\x12.unary.ColumnChunk0\x01\x62\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
 _builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'inventory_pb2', _globals)
 if _descriptor._USE_C_DESCRIPTORS == False:
   DESCRIPTOR._options = None
+  _METHODSTATS_STATUSCODESENTRY._options = None
+  _METHODSTATS_STATUSCODESENTRY._serialized_options = b'8\001'
   _globals['_INVENTORYRECORD']._serialized_start=27
   _globals['_INVENTORYRECORD']._serialized_end=242
   _globals['_INVENTORYREQUEST']._serialized_start=244
-  _globals['_INVENTORYREQUEST']._serialized_end=274
-  _globals['_INVENTORYSEARCHREQUEST']._serialized_start=276
-  _globals['_INVENTORYSEARCHREQUEST']._serialized_end=337
-  _globals['_INVENTORYRANGEREQUEST']._serialized_start=339
-  _globals['_INVENTORYRANGEREQUEST']._serialized_end=428
-  _globals['_DISTRIBUTIONREQUEST']._serialized_start=430
-  _globals['_DISTRIBUTIONREQUEST']._serialized_end=489
-  _globals['_UPDATEREQUEST']._serialized_start=491
-  _globals['_UPDATEREQUEST']._serialized_end=582
-  _globals['_DISTRIBUTIONRESPONSE']._serialized_start=584
-  _globals['_DISTRIBUTIONRESPONSE']._serialized_end=621
-  _globals['_UPDATERESPONSE']._serialized_start=623
-  _globals['_UPDATERESPONSE']._serialized_end=656
-  _globals['_INVENTORYSERVICE']._serialized_start=659
-  _globals['_INVENTORYSERVICE']._serialized_end=1007
+  _globals['_INVENTORYREQUEST']._serialized_end=298
+  _globals['_INVENTORYSEARCHREQUEST']._serialized_start=300
+  _globals['_INVENTORYSEARCHREQUEST']._serialized_end=361
+  _globals['_INVENTORYRANGEREQUEST']._serialized_start=363
+  _globals['_INVENTORYRANGEREQUEST']._serialized_end=472
+  _globals['_DISTRIBUTIONREQUEST']._serialized_start=474
+  _globals['_DISTRIBUTIONREQUEST']._serialized_end=533
+  _globals['_UPDATEREQUEST']._serialized_start=535
+  _globals['_UPDATEREQUEST']._serialized_end=626
+  _globals['_INVENTORYBATCHREQUEST']._serialized_start=628
+  _globals['_INVENTORYBATCHREQUEST']._serialized_end=664
+  _globals['_INVENTORYRECORDS']._serialized_start=666
+  _globals['_INVENTORYRECORDS']._serialized_end=725
+  _globals['_INVENTORYLOOKUPRESULT']._serialized_start=727
+  _globals['_INVENTORYLOOKUPRESULT']._serialized_end=829
+  _globals['_BULKUPDATEREQUEST']._serialized_start=831
+  _globals['_BULKUPDATEREQUEST']._serialized_end=889
+  _globals['_DISTRIBUTIONRESPONSE']._serialized_start=891
+  _globals['_DISTRIBUTIONRESPONSE']._serialized_end=928
+  _globals['_UPDATERESPONSE']._serialized_start=930
+  _globals['_UPDATERESPONSE']._serialized_end=963
+  _globals['_STATSREQUEST']._serialized_start=965
+  _globals['_STATSREQUEST']._serialized_end=979
+  _globals['_LATENCYBUCKET']._serialized_start=981
+  _globals['_LATENCYBUCKET']._serialized_end=1035
+  _globals['_METHODSTATS']._serialized_start=1038
+  _globals['_METHODSTATS']._serialized_end=1352
+  _globals['_METHODSTATS_STATUSCODESENTRY']._serialized_start=1302
+  _globals['_METHODSTATS_STATUSCODESENTRY']._serialized_end=1352
+  _globals['_QUERYCACHESTATS']._serialized_start=1354
+  _globals['_QUERYCACHESTATS']._serialized_end=1433
+  _globals['_SERVERSTATS']._serialized_start=1435
+  _globals['_SERVERSTATS']._serialized_end=1554
+  _globals['_WATCHREQUEST']._serialized_start=1556
+  _globals['_WATCHREQUEST']._serialized_end=1570
+  _globals['_CHANGEEVENT']._serialized_start=1572
+  _globals['_CHANGEEVENT']._serialized_end=1642
+  _globals['_PROFILINGREQUEST']._serialized_start=1644
+  _globals['_PROFILINGREQUEST']._serialized_end=1733
+  _globals['_PROFILINGRESPONSE']._serialized_start=1735
+  _globals['_PROFILINGRESPONSE']._serialized_end=1814
+  _globals['_VALUERANGE']._serialized_start=1816
+  _globals['_VALUERANGE']._serialized_end=1884
+  _globals['_VALUELIST']._serialized_start=1886
+  _globals['_VALUELIST']._serialized_end=1913
+  _globals['_PREDICATE']._serialized_start=1916
+  _globals['_PREDICATE']._serialized_end=2060
+  _globals['_QUERYREQUEST']._serialized_start=2063
+  _globals['_QUERYREQUEST']._serialized_end=2196
+  _globals['_QUERYVALUE']._serialized_start=2198
+  _globals['_QUERYVALUE']._serialized_end=2272
+  _globals['_QUERYROW']._serialized_start=2274
+  _globals['_QUERYROW']._serialized_end=2319
+  _globals['_QUERYRESULT']._serialized_start=2321
+  _globals['_QUERYRESULT']._serialized_end=2417
+  _globals['_AGGREGATEREQUEST']._serialized_start=2420
+  _globals['_AGGREGATEREQUEST']._serialized_end=2554
+  _globals['_COLUMNSUMMARY']._serialized_start=2557
+  _globals['_COLUMNSUMMARY']._serialized_end=2696
+  _globals['_AGGREGATEGROUP']._serialized_start=2698
+  _globals['_AGGREGATEGROUP']._serialized_end=2799
+  _globals['_HISTOGRAM']._serialized_start=2801
+  _globals['_HISTOGRAM']._serialized_end=2843
+  _globals['_AGGREGATERESPONSE']._serialized_start=2845
+  _globals['_AGGREGATERESPONSE']._serialized_end=2941
+  _globals['_EXPORTREQUEST']._serialized_start=2943
+  _globals['_EXPORTREQUEST']._serialized_end=2995
+  _globals['_COLUMNCHUNK']._serialized_start=2998
+  _globals['_COLUMNCHUNK']._serialized_end=3141
+  _globals['_INVENTORYSERVICE']._serialized_start=3144
+  _globals['_INVENTORYSERVICE']._serialized_end=4136
 # @@protoc_insertion_point(module_scope)
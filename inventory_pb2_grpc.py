@@ -29,6 +29,11 @@ class InventoryServiceStub(object):
                 request_serializer=inventory__pb2.InventoryRangeRequest.SerializeToString,
                 response_deserializer=inventory__pb2.InventoryRecord.FromString,
                 )
+        self.searchRangeBatches = channel.unary_stream(
+                '/unary.InventoryService/searchRangeBatches',
+                request_serializer=inventory__pb2.InventoryRangeRequest.SerializeToString,
+                response_deserializer=inventory__pb2.InventoryRecords.FromString,
+                )
         self.getDistribution = channel.unary_unary(
                 '/unary.InventoryService/getDistribution',
                 request_serializer=inventory__pb2.DistributionRequest.SerializeToString,
@@ -39,6 +44,51 @@ class InventoryServiceStub(object):
                 request_serializer=inventory__pb2.UpdateRequest.SerializeToString,
                 response_deserializer=inventory__pb2.UpdateResponse.FromString,
                 )
+        self.batchSearchByID = channel.unary_unary(
+                '/unary.InventoryService/batchSearchByID',
+                request_serializer=inventory__pb2.InventoryBatchRequest.SerializeToString,
+                response_deserializer=inventory__pb2.InventoryRecords.FromString,
+                )
+        self.bulkUpdate = channel.unary_unary(
+                '/unary.InventoryService/bulkUpdate',
+                request_serializer=inventory__pb2.BulkUpdateRequest.SerializeToString,
+                response_deserializer=inventory__pb2.UpdateResponse.FromString,
+                )
+        self.searchByIDStream = channel.stream_stream(
+                '/unary.InventoryService/searchByIDStream',
+                request_serializer=inventory__pb2.InventoryRequest.SerializeToString,
+                response_deserializer=inventory__pb2.InventoryLookupResult.FromString,
+                )
+        self.getStats = channel.unary_unary(
+                '/unary.InventoryService/getStats',
+                request_serializer=inventory__pb2.StatsRequest.SerializeToString,
+                response_deserializer=inventory__pb2.ServerStats.FromString,
+                )
+        self.setProfiling = channel.unary_unary(
+                '/unary.InventoryService/setProfiling',
+                request_serializer=inventory__pb2.ProfilingRequest.SerializeToString,
+                response_deserializer=inventory__pb2.ProfilingResponse.FromString,
+                )
+        self.watchChanges = channel.unary_stream(
+                '/unary.InventoryService/watchChanges',
+                request_serializer=inventory__pb2.WatchRequest.SerializeToString,
+                response_deserializer=inventory__pb2.ChangeEvent.FromString,
+                )
+        self.query = channel.unary_stream(
+                '/unary.InventoryService/query',
+                request_serializer=inventory__pb2.QueryRequest.SerializeToString,
+                response_deserializer=inventory__pb2.QueryResult.FromString,
+                )
+        self.aggregate = channel.unary_unary(
+                '/unary.InventoryService/aggregate',
+                request_serializer=inventory__pb2.AggregateRequest.SerializeToString,
+                response_deserializer=inventory__pb2.AggregateResponse.FromString,
+                )
+        self.export = channel.unary_stream(
+                '/unary.InventoryService/export',
+                request_serializer=inventory__pb2.ExportRequest.SerializeToString,
+                response_deserializer=inventory__pb2.ColumnChunk.FromString,
+                )
 
 
 class InventoryServiceServicer(object):
@@ -62,6 +112,12 @@ class InventoryServiceServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def searchRangeBatches(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
     def getDistribution(self, request, context):
         """Missing associated documentation comment in .proto file."""
         context.set_code(grpc.StatusCode.UNIMPLEMENTED)
@@ -74,6 +130,60 @@ class InventoryServiceServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def batchSearchByID(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def bulkUpdate(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def searchByIDStream(self, request_iterator, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def getStats(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def setProfiling(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def watchChanges(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def query(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def aggregate(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def export(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_InventoryServiceServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -92,6 +202,11 @@ def add_InventoryServiceServicer_to_server(servicer, server):
                     request_deserializer=inventory__pb2.InventoryRangeRequest.FromString,
                     response_serializer=inventory__pb2.InventoryRecord.SerializeToString,
             ),
+            'searchRangeBatches': grpc.unary_stream_rpc_method_handler(
+                    servicer.searchRangeBatches,
+                    request_deserializer=inventory__pb2.InventoryRangeRequest.FromString,
+                    response_serializer=inventory__pb2.InventoryRecords.SerializeToString,
+            ),
             'getDistribution': grpc.unary_unary_rpc_method_handler(
                     servicer.getDistribution,
                     request_deserializer=inventory__pb2.DistributionRequest.FromString,
@@ -102,6 +217,51 @@ def add_InventoryServiceServicer_to_server(servicer, server):
                     request_deserializer=inventory__pb2.UpdateRequest.FromString,
                     response_serializer=inventory__pb2.UpdateResponse.SerializeToString,
             ),
+            'batchSearchByID': grpc.unary_unary_rpc_method_handler(
+                    servicer.batchSearchByID,
+                    request_deserializer=inventory__pb2.InventoryBatchRequest.FromString,
+                    response_serializer=inventory__pb2.InventoryRecords.SerializeToString,
+            ),
+            'bulkUpdate': grpc.unary_unary_rpc_method_handler(
+                    servicer.bulkUpdate,
+                    request_deserializer=inventory__pb2.BulkUpdateRequest.FromString,
+                    response_serializer=inventory__pb2.UpdateResponse.SerializeToString,
+            ),
+            'searchByIDStream': grpc.stream_stream_rpc_method_handler(
+                    servicer.searchByIDStream,
+                    request_deserializer=inventory__pb2.InventoryRequest.FromString,
+                    response_serializer=inventory__pb2.InventoryLookupResult.SerializeToString,
+            ),
+            'getStats': grpc.unary_unary_rpc_method_handler(
+                    servicer.getStats,
+                    request_deserializer=inventory__pb2.StatsRequest.FromString,
+                    response_serializer=inventory__pb2.ServerStats.SerializeToString,
+            ),
+            'setProfiling': grpc.unary_unary_rpc_method_handler(
+                    servicer.setProfiling,
+                    request_deserializer=inventory__pb2.ProfilingRequest.FromString,
+                    response_serializer=inventory__pb2.ProfilingResponse.SerializeToString,
+            ),
+            'watchChanges': grpc.unary_stream_rpc_method_handler(
+                    servicer.watchChanges,
+                    request_deserializer=inventory__pb2.WatchRequest.FromString,
+                    response_serializer=inventory__pb2.ChangeEvent.SerializeToString,
+            ),
+            'query': grpc.unary_stream_rpc_method_handler(
+                    servicer.query,
+                    request_deserializer=inventory__pb2.QueryRequest.FromString,
+                    response_serializer=inventory__pb2.QueryResult.SerializeToString,
+            ),
+            'aggregate': grpc.unary_unary_rpc_method_handler(
+                    servicer.aggregate,
+                    request_deserializer=inventory__pb2.AggregateRequest.FromString,
+                    response_serializer=inventory__pb2.AggregateResponse.SerializeToString,
+            ),
+            'export': grpc.unary_stream_rpc_method_handler(
+                    servicer.export,
+                    request_deserializer=inventory__pb2.ExportRequest.FromString,
+                    response_serializer=inventory__pb2.ColumnChunk.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'unary.InventoryService', rpc_method_handlers)
@@ -163,6 +323,23 @@ class InventoryService(object):
             options, channel_credentials,
             insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
 
+    @staticmethod
+    def searchRangeBatches(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(request, target, '/unary.InventoryService/searchRangeBatches',
+            inventory__pb2.InventoryRangeRequest.SerializeToString,
+            inventory__pb2.InventoryRecords.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
     @staticmethod
     def getDistribution(request,
             target,
@@ -196,3 +373,156 @@ class InventoryService(object):
             inventory__pb2.UpdateResponse.FromString,
             options, channel_credentials,
             insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def batchSearchByID(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/unary.InventoryService/batchSearchByID',
+            inventory__pb2.InventoryBatchRequest.SerializeToString,
+            inventory__pb2.InventoryRecords.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def bulkUpdate(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/unary.InventoryService/bulkUpdate',
+            inventory__pb2.BulkUpdateRequest.SerializeToString,
+            inventory__pb2.UpdateResponse.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def searchByIDStream(request_iterator,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.stream_stream(request_iterator, target, '/unary.InventoryService/searchByIDStream',
+            inventory__pb2.InventoryRequest.SerializeToString,
+            inventory__pb2.InventoryLookupResult.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def getStats(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/unary.InventoryService/getStats',
+            inventory__pb2.StatsRequest.SerializeToString,
+            inventory__pb2.ServerStats.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def setProfiling(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/unary.InventoryService/setProfiling',
+            inventory__pb2.ProfilingRequest.SerializeToString,
+            inventory__pb2.ProfilingResponse.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def watchChanges(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(request, target, '/unary.InventoryService/watchChanges',
+            inventory__pb2.WatchRequest.SerializeToString,
+            inventory__pb2.ChangeEvent.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def query(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(request, target, '/unary.InventoryService/query',
+            inventory__pb2.QueryRequest.SerializeToString,
+            inventory__pb2.QueryResult.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def aggregate(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/unary.InventoryService/aggregate',
+            inventory__pb2.AggregateRequest.SerializeToString,
+            inventory__pb2.AggregateResponse.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def export(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(request, target, '/unary.InventoryService/export',
+            inventory__pb2.ExportRequest.SerializeToString,
+            inventory__pb2.ColumnChunk.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
@@ -0,0 +1,395 @@
+import numpy as np
+import pandas as pd
+from inventory_index import KeyTable, normalize_key
+
+
+def sort_key(value):
+    # How query orders an interned column: numbers by value, then everything else as text
+    if isinstance(value, (int, float)):
+        return (0, float(value))
+    return (1, str(value))
+
+
+INT64_MIN, INT64_MAX = int(np.iinfo(np.int64).min), int(np.iinfo(np.int64).max)
+
+
+def normalizes_to_itself(value):
+    return isinstance(value, str) and not value.startswith('$')
+
+
+# How PackedCategories stores categories that aren't text: kind -> (encode, decode)
+CATEGORY_KINDS = {
+    1: (lambda value: 'True' if value else 'False', lambda text: text == 'True'),
+    2: (lambda value: str(int(value)), int),
+    3: (lambda value: repr(float(value)), float),
+}
+
+
+def category_kind(value):
+    # Raises TypeError for a value PackedCategories can't store
+    if isinstance(value, (bool, np.bool_)):
+        return 1
+    if isinstance(value, (int, np.integer)):
+        return 2
+    if isinstance(value, (float, np.floating)):
+        return 3
+    raise TypeError(f"Can't pack category {value!r} of type {type(value).__name__}.")
+
+
+class PackedCategories:
+    # An interned column's categories as one block of UTF-8 bytes, category code at offsets[code] up to
+    # offsets[code + 1], plus a kind per code that is 0 for text (see CATEGORY_KINDS). Snapshots hold them
+    # this way, so a loaded store reads categories straight from the file, decoding one per lookup.
+    # It is never changed: the store decodes it into a list the first time it needs the whole list.
+
+    def __init__(self, offsets, data, kinds):
+        self.offsets = offsets
+        self.data = data
+        self.kinds = kinds
+
+    @classmethod
+    def pack(cls, categories):
+        if isinstance(categories, cls):
+            return categories
+        kinds = np.zeros(len(categories), dtype=np.uint8)
+        try:
+            encoded = [value.encode('utf-8', 'surrogatepass') for value in categories]
+        except AttributeError:
+            encoded = []
+            for code, value in enumerate(categories):
+                if not isinstance(value, str):
+                    kinds[code] = category_kind(value)
+                    value = CATEGORY_KINDS[kinds[code]][0](value)
+                encoded.append(value.encode('utf-8', 'surrogatepass'))
+        lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+        offsets = np.concatenate(([0], np.cumsum(lengths))).astype(np.int64)
+        return cls(offsets, np.frombuffer(b''.join(encoded), dtype=np.uint8), kinds)
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def __getitem__(self, code):
+        text = self.data[self.offsets[code]:self.offsets[code + 1]].tobytes().decode('utf-8', 'surrogatepass')
+        kind = self.kinds[code]
+        return CATEGORY_KINDS[kind][1](text) if kind else text
+
+    def __iter__(self):
+        return iter(self.tolist())
+
+    def tolist(self):
+        data = self.data.tobytes()
+        bounds = self.offsets.tolist()
+        values = [data[start:end].decode('utf-8', 'surrogatepass') for start, end in zip(bounds, bounds[1:])]
+        for code in np.flatnonzero(self.kinds).tolist():
+            values[code] = CATEGORY_KINDS[self.kinds[code]][1](values[code])
+        return values
+
+    def alias_candidates(self):
+        # Codes of the categories that may not be their own normalized value: not text, or starting with '$'
+        starts = self.offsets[:-1]
+        dollar = np.zeros(len(self), dtype=bool)
+        nonempty = self.offsets[1:] > starts
+        dollar[nonempty] = self.data[starts[nonempty]] == ord('$')
+        return np.flatnonzero(dollar | (self.kinds != 0)).tolist()
+
+
+class ColumnStore:
+    # Columnar storage for the inventory sheet.
+    # Numeric columns live in typed NumPy arrays; every other column is interned as a list of distinct
+    # values plus an int32 code per row. Each column has a validity mask marking missing cells.
+
+    def __init__(self, length=0):
+        self.length = length
+        self.columns = []
+        self.numeric = {}
+        self.codes = {}
+        self.categories = {}
+        self.key_tables = {}
+        self.alias_codes = {}
+        self.category_ranks = {}
+        self.valid = {}
+
+    @classmethod
+    def from_dataframe(cls, df):
+        store = cls(len(df))
+        for column in df.columns:
+            store.add_series(column, df[column])
+        return store
+
+    def add_series(self, column, series):
+        if pd.api.types.is_bool_dtype(series.dtype) or pd.api.types.is_integer_dtype(series.dtype):
+            self.add_numeric(column, series.to_numpy(dtype=np.int64), np.ones(self.length, dtype=bool))
+        elif pd.api.types.is_float_dtype(series.dtype):
+            values = series.to_numpy(dtype=np.float64)
+            self.add_numeric(column, values, ~np.isnan(values))
+        else:
+            codes, uniques = pd.factorize(series)
+            self.add_interned(column, np.where(codes >= 0, codes, 0).astype(np.int32), list(uniques), codes >= 0)
+
+    def add_numeric(self, column, values, valid):
+        self.columns.append(column)
+        self.numeric[column] = values
+        self.valid[column] = valid
+
+    def add_interned(self, column, codes, categories, valid):
+        self.columns.append(column)
+        self.codes[column] = codes
+        self.categories[column] = categories
+        self.valid[column] = valid
+
+    def add_column(self, column):
+        # New columns created by update start out as all-missing interned columns
+        self.add_interned(column, np.zeros(self.length, dtype=np.int32), [], np.zeros(self.length, dtype=bool))
+
+    def __len__(self):
+        return self.length
+
+    def __contains__(self, column):
+        return column in self.valid
+
+    def is_numeric(self, column):
+        return column in self.numeric
+
+    def value(self, index, column):
+        # Python-level value of one cell; missing cells read as NaN, as pandas records did
+        if column not in self.valid or not self.valid[column][index]:
+            return float('nan')
+        if column in self.numeric:
+            return self.numeric[column][index].item()
+        return self.categories[column][self.codes[column][index]]
+
+    def row(self, index):
+        return {column: self.value(index, column) for column in self.columns}
+
+    def numeric_view(self, column):
+        # (values, mask) for a numeric column, or None when the column is not numeric
+        if column not in self.numeric:
+            return None
+        values = self.numeric[column]
+        mask = self.valid[column]
+        if values.dtype.kind == 'f':
+            mask = mask & ~np.isnan(values)
+        return values, mask
+
+    def code(self, index, column):
+        # A cell's category code, -1 when it is missing; None for a numeric or unknown column
+        if column not in self.codes:
+            return None
+        return int(self.codes[column][index]) if self.valid[column][index] else -1
+
+    def category_list(self, column):
+        # The column's categories as a list, decoding packed ones the first time the whole list is needed
+        categories = self.categories[column]
+        if isinstance(categories, PackedCategories):
+            categories = self.categories[column] = categories.tolist()
+        return categories
+
+    def cells(self, column, rows=None):
+        # (values or codes, valid) for a column, at rows if given
+        data = self.numeric[column] if column in self.numeric else self.codes[column]
+        valid = self.valid[column]
+        if rows is None:
+            return data, valid
+        return data[rows], valid[rows]
+
+    def column_arrays(self, column):
+        # (values or codes, valid, categories or None) as copies, safe to read once the lock is released
+        data, valid = self.cells(column)
+        categories = None
+        if column in self.categories:
+            # Packed categories are never changed, so they needn't be copied
+            categories = self.categories[column]
+            if not isinstance(categories, PackedCategories):
+                categories = list(categories)
+        return data.copy(), valid.copy(), categories
+
+    def copy(self):
+        # The data as it is now, safe to read once the lock is released: arrays are copied, which is quick
+        # next to converting them, and key tables shared while nothing has been added to them
+        store = ColumnStore(self.length)
+        for column in self.columns:
+            data, valid, categories = self.column_arrays(column)
+            if categories is None:
+                store.add_numeric(column, data, valid)
+                continue
+            store.add_interned(column, data, categories, valid)
+            table = self.key_tables.get(column)
+            if table is not None and not table.added:
+                store.key_tables[column] = KeyTable(table.slots, table.mask)
+        return store
+
+    def values_at(self, column, rows):
+        # Python values of a column at rows, None for missing cells
+        data, valid = self.cells(column, rows)
+        if column in self.numeric:
+            return [value if is_valid and value == value else None
+                    for value, is_valid in zip(data.tolist(), valid.tolist())]
+        categories = self.categories[column]
+        return [categories[code] if is_valid else None for code, is_valid in zip(data.tolist(), valid.tolist())]
+
+    def sort_ranks(self, column):
+        # Each code's place when the column's values are sorted by sort_key, and the sorted keys themselves.
+        # Categories are only ever appended, so this is rebuilt when their number changes.
+        categories = self.category_list(column)
+        cached = self.category_ranks.get(column)
+        if cached is None or len(cached[1]) != len(categories):
+            keys = [sort_key(value) for value in categories]
+            order = sorted(range(len(keys)), key=keys.__getitem__)
+            ranks = np.empty(len(keys), dtype=np.int64)
+            ranks[order] = np.arange(len(keys))
+            cached = self.category_ranks[column] = (ranks, [keys[code] for code in order])
+        return cached
+
+    def key_table(self, column):
+        # Built the first time a column is written to or matched exactly
+        if column not in self.key_tables:
+            self.key_tables[column] = KeyTable.build(self.categories[column])
+        return self.key_tables[column]
+
+    def code_of(self, column, value):
+        # Code of the category equal to value in an interned column, None if there is none
+        if column not in self.categories:
+            return None
+        return self.key_table(column).get(self.categories[column], value)
+
+    def intern(self, column, value):
+        code = self.code_of(column, value)
+        if code is None:
+            categories = self.category_list(column)
+            code = len(categories)
+            categories.append(value)
+            self.key_table(column).add(value, code)
+            if column in self.alias_codes and not normalizes_to_itself(value):
+                self.alias_codes[column].setdefault(normalize_key(value), []).append(code)
+        return code
+
+    def set_value(self, index, column, raw_value):
+        # Store an update's string value with the column's type.
+        # Returns True when the column's representation changed (new column or int promoted to float),
+        # in which case any index over it has to be rebuilt.
+        changed = False
+        if column not in self.valid:
+            self.add_column(column)
+            changed = True
+        if column not in self.numeric:
+            self.codes[column][index] = self.intern(column, raw_value)
+            self.valid[column][index] = True
+            return changed
+        if str(raw_value).strip() == "":
+            self.valid[column][index] = False
+            return changed
+        number, promote = self.convert(column, raw_value)
+        if promote:
+            self.numeric[column] = self.numeric[column].astype(np.float64)
+            changed = True
+        self.numeric[column][index] = number
+        self.valid[column][index] = True
+        return changed
+
+    def convert(self, column, raw_value):
+        # (number, promote): a numeric column's value for raw_value, and whether the column has to become
+        # float64 to hold it. Raises ValueError for non-numeric input and OverflowError for an integer an
+        # int64 column can't hold.
+        if self.numeric[column].dtype.kind != 'i':
+            return float(raw_value), False
+        try:
+            number = int(raw_value)
+        except ValueError:
+            return float(raw_value), True
+        if not INT64_MIN <= number <= INT64_MAX:
+            raise OverflowError(f"{number} is out of range for an int64 column.")
+        return number, False
+
+    def check_value(self, column, raw_value):
+        # Raise what set_value would for raw_value in this column, without changing anything
+        if column in self.numeric and str(raw_value).strip() != "":
+            self.convert(column, raw_value)
+
+    def find_exact(self, column, value):
+        # First row whose cell equals value exactly, as update() matches its key
+        if column in self.categories:
+            code = self.code_of(column, value)
+            if code is None:
+                return None
+            matches = np.flatnonzero((self.codes[column] == code) & self.valid[column])
+            return int(matches[0]) if len(matches) else None
+        return None
+
+    def aliases(self, column):
+        # normalized value -> codes of the categories that aren't their own normalized value (text with a
+        # leading '$', or not text); built on first use and kept current by intern()
+        if column not in self.alias_codes:
+            aliases = {}
+            categories = self.categories[column]
+            candidates = (categories.alias_candidates() if isinstance(categories, PackedCategories)
+                          else range(len(categories)))
+            for code in candidates:
+                if not normalizes_to_itself(categories[code]):
+                    aliases.setdefault(normalize_key(categories[code]), []).append(code)
+            self.alias_codes[column] = aliases
+        return self.alias_codes[column]
+
+    def normalized_codes(self, column, key):
+        # Codes of the categories whose normalized value is key, which is itself normalized
+        codes = self.aliases(column).get(key, [])
+        code = self.code_of(column, key)
+        return codes + [code] if code is not None else codes
+
+    def match_mask(self, column, key):
+        # Vectorized search(): rows whose normalized value equals the normalized key
+        return self.match_any_mask(column, [key])
+
+    def match_any_mask(self, column, keys, rows=None):
+        # Rows (of rows, if given) whose normalized value equals any of the normalized keys
+        mask = np.zeros(self.length if rows is None else len(rows), dtype=bool)
+        if column not in self.valid:
+            return mask
+        data, valid = self.cells(column, rows)
+        if 'nan' in keys:
+            mask |= ~valid
+        if column in self.numeric:
+            for key in keys:
+                try:
+                    number = float(key)
+                except ValueError:
+                    continue
+                # Equal cells print the same, but may not print as the key did (56 vs '56.0')
+                stored = int(number) if data.dtype.kind == 'i' and number.is_integer() else number
+                if normalize_key(stored) == key:
+                    mask |= (data == number) & valid
+            return mask
+        codes = [code for key in keys for code in self.normalized_codes(column, key)]
+        if codes:
+            mask |= np.isin(data, codes) & valid
+        return mask
+
+    def range_mask(self, column, start, end, rows=None):
+        # NaN fails both comparisons, so only present numbers between start and end match
+        if column not in self.numeric:
+            return np.zeros(self.length if rows is None else len(rows), dtype=bool)
+        values, valid = self.cells(column, rows)
+        return valid & (values >= start) & (values <= end)
+
+    def prefix_mask(self, column, prefix, rows=None):
+        # Rows whose normalized value starts with prefix; missing cells never match
+        if column not in self.valid:
+            return np.zeros(self.length if rows is None else len(rows), dtype=bool)
+        data, valid = self.cells(column, rows)
+        if column in self.numeric:
+            matching = [value for value in np.unique(data[valid]).tolist()
+                        if normalize_key(value).startswith(prefix)]
+        else:
+            matching = [code for code, value in enumerate(self.category_list(column))
+                        if normalize_key(value).startswith(prefix)]
+        return np.isin(data, matching) & valid
+
+    def to_dataframe(self):
+        data = {}
+        for column in self.columns:
+            if column in self.numeric:
+                series = pd.Series(self.numeric[column])
+            else:
+                categories = pd.Series(self.category_list(column) + [None], dtype=object)
+                series = pd.Series(categories.to_numpy()[self.codes[column]], dtype=object)
+            data[column] = series.where(self.valid[column])
+        return pd.DataFrame(data, columns=self.columns)
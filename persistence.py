@@ -0,0 +1,138 @@
+import json
+import os
+import threading
+from contextlib import nullcontext
+
+
+def fsync_path(path):
+    # Force a file, or a directory's entries, to disk. Windows can't open directories, nor needs to.
+    if os.name == 'nt' and os.path.isdir(path):
+        return
+    descriptor = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(descriptor)
+    finally:
+        os.close(descriptor)
+
+
+class WriteBehindLog:
+    # Write-behind persistence for updates.
+    # Each change (or list of changes from one bulk update, kept together on one line) is appended to a
+    # JSON-lines log before the update is acknowledged, and the workbook is rewritten in the background once
+    # batch_size changes are pending or flush_interval seconds pass.
+    # After a workbook write the log is cut back to the changes that arrived while it was being written, so
+    # save must only return once what it wrote is on disk.
+    # consistent is a context manager under which no change is applied or logged (the data's read lock),
+    # so the snapshot and the log position taken under it agree. Updates wait while it is held, so snapshot
+    # should only copy the data; anything slower belongs in save, which runs after it is released.
+
+    def __init__(self, log_path, snapshot, save, batch_size=100, flush_interval=5.0, fsync=True,
+                 consistent=nullcontext):
+        self.log_path = log_path
+        self.snapshot = snapshot
+        self.save = save
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.consistent = consistent
+        self.pending = 0
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.closed = False
+        self.log_file = None
+        self.thread = None
+
+    def replay(self):
+        # Changes logged but not yet in the workbook, in the order they were made
+        if not os.path.exists(self.log_path):
+            return []
+        entries = []
+        with open(self.log_path, 'r', encoding='utf-8') as log_file:
+            for line in log_file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break  # A torn final line from a crash mid-append
+                entries.extend(entry if isinstance(entry, list) else [entry])
+        self.pending = len(entries)
+        return entries
+
+    def start(self):
+        self.log_file = open(self.log_path, 'a', encoding='utf-8')
+        self.thread = threading.Thread(target=self.run, name='write-behind', daemon=True)
+        self.thread.start()
+
+    def append(self, entry):
+        # Written and flushed to the OS, but only durable once sync() returns
+        with self.lock:
+            self.log_file.write(json.dumps(entry) + '\n')
+            self.log_file.flush()
+            self.pending += len(entry) if isinstance(entry, list) else 1
+            if self.pending >= self.batch_size:
+                self.wakeup.set()
+
+    def sync(self):
+        # Force every change appended so far to disk. fsync runs on a duplicate descriptor outside the lock, so it
+        # neither blocks other appends nor breaks if a concurrent flush swaps the log file
+        if not self.fsync:
+            return
+        with self.lock:
+            descriptor = os.dup(self.log_file.fileno())
+        try:
+            os.fsync(descriptor)
+        finally:
+            os.close(descriptor)
+
+    def run(self):
+        while not self.closed:
+            self.wakeup.wait(self.flush_interval)
+            self.wakeup.clear()
+            if self.pending:
+                try:
+                    self.flush()
+                except Exception as error:
+                    # Changes stay in the log and pending, so the next round retries them
+                    print(f"Write-behind flush failed: {error}")
+
+    def flush(self):
+        with self.flush_lock:
+            with self.consistent():
+                with self.lock:
+                    if not self.pending:
+                        return
+                    offset = self.log_file.tell()
+                    flushed, self.pending = self.pending, 0
+                data = self.snapshot()
+            try:
+                self.save(data)
+            except Exception:
+                with self.lock:
+                    self.pending += flushed
+                raise
+            with self.lock:
+                # Keep only what was logged after the snapshot was taken
+                self.log_file.close()
+                with open(self.log_path, 'r', encoding='utf-8') as log_file:
+                    log_file.seek(offset)
+                    remainder = log_file.read()
+                temporary_path = self.log_path + '.tmp'
+                with open(temporary_path, 'w', encoding='utf-8') as log_file:
+                    log_file.write(remainder)
+                    log_file.flush()
+                    os.fsync(log_file.fileno())
+                os.replace(temporary_path, self.log_path)
+                if self.fsync:
+                    # Later appends go to the new log, so its name has to survive a crash too
+                    fsync_path(os.path.dirname(os.path.abspath(self.log_path)))
+                self.log_file = open(self.log_path, 'a', encoding='utf-8')
+
+    def close(self):
+        # Graceful shutdown: stop the background thread and write out everything still pending
+        self.closed = True
+        self.wakeup.set()
+        if self.thread is not None:
+            self.thread.join()
+        self.flush()
+        if self.log_file is not None:
+            self.log_file.close()
@@ -0,0 +1,232 @@
+import itertools
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+from concurrent import futures
+import grpc
+import inventory_pb2_grpc
+from server import InventoryServiceServicer, SHUTDOWN_GRACE, SERVER_OPTIONS, WORKERS_PER_WATCHER, UpdateRejected
+from metrics import MetricsInterceptor
+from profiler import ProfilingInterceptor
+from compression import CompressionInterceptor
+
+# Pre-fork serving: N worker processes each run a sync grpc.server bound to the same port with
+# SO_REUSEPORT, so the kernel spreads connections over them and every worker has its own GIL.
+# Workers start from the parent's freshly written snapshot, which they memory-map, so the operating
+# system shares the data pages between them.
+#
+# The parent is the coordinator for updates. A worker sends each update, by key, up to it without changing
+# anything itself. The coordinator takes them one at a time in a single global order: it resolves the keys
+# and applies the changes to its own copy under its write lock, logs them through the write-behind log (the
+# only writer of the workbook), and broadcasts the changes by row to every worker. Every worker applies
+# the same changes in the same order to the same rows, so row positions mean the same everywhere. The
+# update is acknowledged only once every live worker has confirmed it applied the changes, so a client's
+# next call reads its write whichever worker it reaches. For the same reason workers hold back the
+# watchChanges events for a change until the coordinator says every worker has it: a client cache that
+# watches one worker and is told of the change can fill from any of them.
+
+
+class CoordinatorLink:
+    # Worker end of the coordinator pipe: submits this worker's updates and applies everyone's changes.
+    # Stands in for the servicer's WriteBehindLog too, as the coordinator does the saving.
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.send_lock = threading.Lock()
+        self.request_ids = itertools.count()
+        # request_id -> [event set once the coordinator answers, its answer]
+        self.pending = {}
+        self.lost = False
+        self.servicer = None
+        self.on_disconnect = None
+
+    def attach(self, servicer):
+        self.servicer = servicer
+        threading.Thread(target=self.receive, name='coordinator-link', daemon=True).start()
+
+    def send(self, message):
+        with self.send_lock:
+            self.connection.send(message)
+
+    def submit(self, updates, numbered):
+        # Returns once the coordinator has saved the updates and every worker has applied them; raises
+        # UpdateRejected as commit_updates does
+        request_id = next(self.request_ids)
+        answer = self.pending[request_id] = [threading.Event(), None]
+        if self.lost:
+            self.pending.pop(request_id)
+            raise ConnectionError("Lost the coordinator process; updates can't be saved.")
+        self.send(('update', request_id, updates, numbered))
+        answer[0].wait()
+        if self.lost and self.pending.pop(request_id, None) is not None:
+            raise ConnectionError("Lost the coordinator process before the update was saved.")
+        if answer[1] is not None:
+            raise UpdateRejected(*answer[1])
+
+    def receive(self):
+        while True:
+            try:
+                message = self.connection.recv()
+            except (EOFError, OSError):
+                break
+            if message[0] == 'change':
+                _, sequence, entry = message
+                with self.servicer.lock.write():
+                    for change in changes(entry):
+                        self.servicer.apply_change(change['row'], change['column'], change['value'])
+                try:
+                    self.send(('applied', sequence))
+                except OSError:
+                    break
+            elif message[0] == 'release':
+                self.servicer.change_feed.release()
+            elif message[0] == 'ack':
+                _, request_id, rejection = message
+                answer = self.pending.pop(request_id)
+                answer[1] = rejection
+                answer[0].set()
+        # The coordinator is gone, so this worker can neither save changes nor hear about other workers'.
+        # Fail the updates still waiting on it and stop serving rather than drift from the saved data.
+        self.lost = True
+        for answer in list(self.pending.values()):
+            answer[0].set()
+        if self.on_disconnect is not None:
+            self.on_disconnect()
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.connection.close()
+
+
+def changes(entry):
+    # A log entry is one change, or the list of changes from a bulk update
+    return entry if isinstance(entry, list) else [entry]
+
+
+def run_worker(connection, excel_file_path, port, max_workers, method_compression):
+    link = CoordinatorLink(connection)
+    inventory_service = InventoryServiceServicer(excel_file_path, change_log=link, coordinator=link,
+                                                 max_watchers=max_workers // WORKERS_PER_WATCHER)
+    inventory_service.change_feed.hold()
+    link.attach(inventory_service)
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=max_workers),
+                         options=SERVER_OPTIONS + [('grpc.so_reuseport', 1)],
+                         interceptors=[MetricsInterceptor(inventory_service.metrics),
+                                       ProfilingInterceptor(inventory_service.profiler),
+                                       CompressionInterceptor(method_compression)])
+    inventory_pb2_grpc.add_InventoryServiceServicer_to_server(inventory_service, server)
+    server.add_insecure_port(f'[::]:{port}')
+    link.on_disconnect = lambda: server.stop(SHUTDOWN_GRACE)
+    server.start()
+    print(f"gRPC worker {os.getpid()} is running ............ \n")
+
+    signal.signal(signal.SIGTERM, lambda signum, frame: server.stop(SHUTDOWN_GRACE))
+    try:
+        server.wait_for_termination()
+    except KeyboardInterrupt:
+        server.stop(SHUTDOWN_GRACE).wait()
+    inventory_service.close()
+
+
+class Coordinator:
+    # Parent end of every worker's pipe. One thread per pipe reads it; a single committer thread applies the
+    # submitted updates in order and is the only one that writes to the pipes.
+
+    def __init__(self, servicer, connections):
+        self.servicer = servicer
+        self.connections = connections
+        self.requests = queue.Queue()
+        self.condition = threading.Condition()
+        # Per worker: the last broadcast sequence it has applied, and whether its pipe is still open
+        self.applied = [0] * len(connections)
+        self.live = [True] * len(connections)
+        self.sequence = 0
+
+    def start(self):
+        for worker in range(len(self.connections)):
+            threading.Thread(target=self.read, args=(worker,), name=f'coordinator-read-{worker}',
+                             daemon=True).start()
+        threading.Thread(target=self.commit, name='coordinator-commit', daemon=True).start()
+
+    def read(self, worker):
+        while True:
+            try:
+                message = self.connections[worker].recv()
+            except (EOFError, OSError):
+                break
+            if message[0] == 'update':
+                self.requests.put((worker,) + message[1:])
+            elif message[0] == 'applied':
+                with self.condition:
+                    self.applied[worker] = message[1]
+                    self.condition.notify_all()
+        with self.condition:
+            # That worker has exited; nobody waits for it any more
+            self.live[worker] = False
+            self.condition.notify_all()
+
+    def send(self, worker, message):
+        try:
+            self.connections[worker].send(message)
+        except OSError:
+            pass  # That worker has exited; read() notices
+
+    def commit(self):
+        while True:
+            worker, request_id, updates, numbered = self.requests.get()
+            try:
+                entry = self.servicer.commit_updates(updates, numbered)
+            except UpdateRejected as rejection:
+                self.send(worker, ('ack', request_id, (rejection.code, rejection.details)))
+                continue
+            if entry is not None:
+                self.servicer.change_log.sync()
+                self.sequence += 1
+                for other in range(len(self.connections)):
+                    self.send(other, ('change', self.sequence, entry))
+                with self.condition:
+                    self.condition.wait_for(lambda: all(applied >= self.sequence or not live
+                                                        for applied, live in zip(self.applied, self.live)))
+                for other in range(len(self.connections)):
+                    self.send(other, ('release', self.sequence))
+            self.send(worker, ('ack', request_id, None))
+
+
+def serve_prefork(excel_file_path='InventoryData.xlsx', port=50051, workers=None, max_workers=10,
+                  method_compression=None):
+    workers = workers or os.cpu_count()
+
+    # The coordinator replays any logged changes and writes them through, so the snapshot the workers
+    # load already holds every acknowledged update
+    coordinator = InventoryServiceServicer(excel_file_path)
+    coordinator.save_inventory_data()
+
+    context = multiprocessing.get_context('spawn')
+    connections = []
+    processes = []
+    for _ in range(workers):
+        parent_end, worker_end = context.Pipe()
+        process = context.Process(target=run_worker,
+                                  args=(worker_end, excel_file_path, port, max_workers, method_compression or {}))
+        process.start()
+        worker_end.close()
+        connections.append(parent_end)
+        processes.append(process)
+
+    Coordinator(coordinator, connections).start()
+    print(f"gRPC Server is running with {workers} worker processes ............ \n")
+
+    # SIGTERM is passed on to the workers; Ctrl+C already reaches the whole process group
+    signal.signal(signal.SIGTERM, lambda signum, frame: [process.terminate() for process in processes])
+    for process in processes:
+        while process.is_alive():
+            try:
+                process.join()
+            except KeyboardInterrupt:
+                pass
+    coordinator.close()
+    print("gRPC Server terminated !!!")
@@ -0,0 +1,129 @@
+import cProfile
+import io
+import os
+import pstats
+import random
+import threading
+import grpc
+from metrics import wrap_handler, method_name
+
+# Functions listed per method in the hot spot summary
+HOT_SPOT_LINES = 25
+# Streams whose messages mostly wait, on updates or on the client's next request, rather than compute: their
+# profiles would time the waiting and keep every other call from being profiled while it lasts
+UNPROFILED_METHODS = ('watchChanges', 'searchByIDStream')
+
+
+class CallProfiler:
+    # Runs cProfile over a random sample_rate fraction of calls and adds each profile to its method's totals.
+    # With sample_rate at 0 a call costs one comparison. Totals are written out by dump().
+
+    def __init__(self, directory, sample_rate=0.0):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.lock = threading.Lock()
+        # Held while a profiler is enabled (see run())
+        self.active = threading.Lock()
+        self.stats = {}
+        self.profiled_calls = 0
+
+    def sample(self):
+        # A profiler for this call, or None. Run the call's work under it with run() and pass it to record()
+        # once the call is done.
+        if self.sample_rate and random.random() < self.sample_rate:
+            return cProfile.Profile()
+        return None
+
+    def run(self, profile, function, *args):
+        # function(*args), profiled with profile unless other work is being profiled at the moment, in which
+        # case it runs unprofiled. Only one profiler is enabled at a time: from Python 3.12 cProfile runs on
+        # the process-wide sys.monitoring, where a second profiler can't be enabled alongside the first. The
+        # lock is held only while function runs, so a stream's profile covers each message it produces
+        # without shutting other calls out in between.
+        if not self.active.acquire(blocking=False):
+            return function(*args)
+        try:
+            return profile.runcall(function, *args)
+        finally:
+            self.active.release()
+
+    def record(self, method, profile):
+        try:
+            stats = pstats.Stats(profile)
+        except TypeError:
+            return  # It never got to run (see run())
+        with self.lock:
+            if method in self.stats:
+                self.stats[method].add(stats)
+            else:
+                self.stats[method] = stats
+            self.profiled_calls += 1
+
+    def reset(self):
+        with self.lock:
+            self.stats = {}
+            self.profiled_calls = 0
+
+    def dump(self):
+        # One .prof file per method for pstats or snakeviz, plus a text summary of the top functions by
+        # cumulative time. File names carry the pid so prefork workers don't overwrite each other.
+        directory = os.path.abspath(self.directory)
+        os.makedirs(directory, exist_ok=True)
+        paths = []
+        summary = io.StringIO()
+        with self.lock:
+            for method, stats in sorted(self.stats.items()):
+                path = os.path.join(directory, f'{method}.{os.getpid()}.prof')
+                stats.dump_stats(path)
+                paths.append(path)
+                summary.write(f'==== {method} ({stats.total_calls} function calls, {stats.total_tt:.3f}s) ====\n')
+                stats.stream = summary
+                stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(HOT_SPOT_LINES)
+        summary_path = os.path.join(directory, f'hotspots.{os.getpid()}.txt')
+        with open(summary_path, 'w') as summary_file:
+            summary_file.write(summary.getvalue())
+        return [summary_path] + paths
+
+
+class ProfilingInterceptor(grpc.ServerInterceptor):
+    # Feeds sampled calls of the thread-pool server to a CallProfiler. cProfile follows only the calling
+    # thread, which is the one running the handler; streaming handlers are profiled while producing each
+    # message, not while it is being sent.
+
+    def __init__(self, profiler):
+        self.profiler = profiler
+
+    def intercept_service(self, continuation, handler_call_details):
+        method = method_name(handler_call_details)
+        if method in UNPROFILED_METHODS:
+            return continuation(handler_call_details)
+        return wrap_handler(continuation(handler_call_details), method, self.unary, self.streaming)
+
+    def unary(self, method, behavior):
+        def handle(request, context):
+            profile = self.profiler.sample()
+            if profile is None:
+                return behavior(request, context)
+            try:
+                return self.profiler.run(profile, behavior, request, context)
+            finally:
+                self.profiler.record(method, profile)
+        return handle
+
+    def streaming(self, method, behavior):
+        def handle(request, context):
+            profile = self.profiler.sample()
+            if profile is None:
+                yield from behavior(request, context)
+                return
+            responses = behavior(request, context)
+            try:
+                while True:
+                    try:
+                        response = self.profiler.run(profile, next, responses)
+                    except StopIteration:
+                        return
+                    yield response
+            finally:
+                self.profiler.record(method, profile)
+        return handle
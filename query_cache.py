@@ -0,0 +1,68 @@
+import threading
+import time
+from lru import LRUCache
+
+
+class RecordingContext:
+    # Passes everything through to the real context, remembering the status code and details that were set
+
+    def __init__(self, context):
+        self.context = context
+        self.code = None
+        self.details = None
+
+    def set_code(self, code):
+        self.code = code
+        self.context.set_code(code)
+
+    def set_details(self, details):
+        self.details = details
+        self.context.set_details(details)
+
+    def __getattr__(self, name):
+        return getattr(self.context, name)
+
+
+class QueryCache:
+    # Result cache for read RPCs, keyed by method and serialized request.
+    # Each entry remembers the data versions of the columns its answer depends on and is treated as a
+    # miss once any of them has moved on, so an update invalidates exactly the queries it could change.
+    # Entries are also evicted least recently used beyond maxsize and, if ttl is set, after ttl seconds.
+
+    def __init__(self, maxsize, ttl=None):
+        self.entries = LRUCache(maxsize)
+        self.ttl = ttl
+        self.counter_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+
+    def call(self, method, request, context, versions, compute):
+        key = (method, request.SerializeToString(deterministic=True))
+        entry = self.entries.get(key)
+        if entry is not None:
+            response, code, details, entry_versions, expires = entry
+            if entry_versions == versions and (expires is None or time.monotonic() < expires):
+                self.count('hits')
+                if code is not None:
+                    context.set_code(code)
+                if details is not None:
+                    context.set_details(details)
+                return response
+            self.entries.pop(key)
+            self.count('stale')
+        self.count('misses')
+
+        # versions were read before computing, so an update racing with compute only makes the entry stale
+        recording_context = RecordingContext(context)
+        response = compute(request, recording_context)
+        expires = time.monotonic() + self.ttl if self.ttl else None
+        self.entries.put(key, (response, recording_context.code, recording_context.details, versions, expires))
+        return response
+
+    def count(self, counter):
+        with self.counter_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'stale': self.stale, 'entries': len(self.entries)}
@@ -0,0 +1,205 @@
+import base64
+import bisect
+import hashlib
+import json
+import numpy as np
+import inventory_pb2
+from inventory_index import column_codes
+from inventory_store import sort_key
+
+# The query RPC: predicates over any columns that a row must all satisfy, a projection, an order and
+# keyset pagination. The planner only looks at indexes the servicer already has (a query never builds one)
+# and starts from the predicate they say matches fewest rows, checking the others on just those rows.
+# Without a selective enough index it scans: the first predicate is a vectorized mask over the whole
+# table and each later one is only evaluated on the rows still in the running.
+
+# An index is used only when it leaves at most this fraction of the table; past that a scan is cheaper
+INDEX_MAX_FRACTION = 0.25
+
+
+def parse_predicate(predicate, store):
+    # (column, kind, operand), with values normalized the way search normalizes key_value
+    column = predicate.column
+    if column not in store:
+        raise ValueError(f"Unknown column '{column}'.")
+    kind = predicate.WhichOneof('condition')
+    if kind == 'eq':
+        return column, 'any_of', [predicate.eq.lstrip('$')]
+    if kind == 'any_of':
+        return column, 'any_of', list(dict.fromkeys(value.lstrip('$') for value in predicate.any_of.values))
+    if kind == 'prefix':
+        return column, 'prefix', predicate.prefix.lstrip('$')
+    if kind == 'range':
+        if not store.is_numeric(column):
+            raise ValueError(f"Column '{column}' is not numeric.")
+        value_range = predicate.range
+        start = value_range.start if value_range.HasField('start') else -np.inf
+        end = value_range.end if value_range.HasField('end') else np.inf
+        return column, 'range', (start, end)
+    raise ValueError(f"Predicate on '{column}' has no condition.")
+
+
+def fingerprint(request):
+    # What a cursor's position is relative to: the filter and the order, not the projection or page size
+    key = inventory_pb2.QueryRequest(where=request.where, order_by=request.order_by, descending=request.descending)
+    return hashlib.sha1(key.SerializeToString(deterministic=True)).hexdigest()[:16]
+
+
+def query_value(value):
+    if value is None:
+        return inventory_pb2.QueryValue()
+    if isinstance(value, int):
+        return inventory_pb2.QueryValue(integer=value)
+    if isinstance(value, float):
+        return inventory_pb2.QueryValue(number=value)
+    return inventory_pb2.QueryValue(text=str(value))
+
+
+class Query:
+    # One QueryRequest checked against the store. Raises ValueError for anything the request gets wrong.
+    # Call plan(), page() and rows() under the servicer's read lock.
+
+    def __init__(self, request, store):
+        self.store = store
+        self.predicates = [parse_predicate(predicate, store) for predicate in request.where]
+        self.columns = list(request.columns) or list(store.columns)
+        for column in self.columns + ([request.order_by] if request.order_by else []):
+            if column not in store:
+                raise ValueError(f"Unknown column '{column}'.")
+        if request.limit < 0:
+            raise ValueError(f"Limit must not be negative, got {request.limit}.")
+        self.order_by = request.order_by
+        self.descending = request.descending
+        self.limit = request.limit
+        self.fingerprint = fingerprint(request)
+        self.cursor = self.decode_cursor(request.cursor) if request.cursor else None
+
+    def plan(self, id_index, secondary_indexes, range_indexes):
+        # (candidate rows, or None to scan; the predicates left to check; a description of the plan)
+        best = None
+        for position, (column, kind, operand) in enumerate(self.predicates):
+            index = self.key_index(column, id_index, secondary_indexes) if kind == 'any_of' else None
+            if index is not None:
+                estimate = sum(len(index.lookup(key)) for key in operand)
+            elif kind == 'range' and column in range_indexes:
+                estimate = range_indexes[column].count(*operand)
+            else:
+                continue
+            if best is None or estimate < best[0]:
+                best = (estimate, position)
+        if best is None or best[0] > len(self.store) * INDEX_MAX_FRACTION:
+            return None, self.predicates, f"scan of {len(self.store)} rows"
+        estimate, position = best
+        column, kind, operand = self.predicates[position]
+        if kind == 'range':
+            # between() lists rows in value order; sheet order keeps the later gathers sequential
+            rows = np.sort(range_indexes[column].between(*operand))
+            description = f"range index on {column}, {estimate} candidate rows"
+        else:
+            index = self.key_index(column, id_index, secondary_indexes)
+            rows = np.unique(np.concatenate([np.zeros(0, dtype=np.int64)] + [index.lookup(key) for key in operand]))
+            name = 'hash index' if index is secondary_indexes.get(column) else 'primary key index'
+            description = f"{name} on {column}, {estimate} candidate rows"
+        return rows, self.predicates[:position] + self.predicates[position + 1:], description
+
+    def key_index(self, column, id_index, secondary_indexes):
+        # The index that can answer an eq or any_of predicate on column, if any
+        if column in secondary_indexes:
+            return secondary_indexes[column]
+        if column == id_index.column and column_codes(self.store, column):
+            return id_index
+        return None
+
+    def matching_rows(self, rows, predicates):
+        # Rows (all of them when rows is None) that satisfy every predicate, in sheet order
+        for column, kind, operand in predicates:
+            if kind == 'range':
+                mask = self.store.range_mask(column, *operand, rows=rows)
+            elif kind == 'prefix':
+                mask = self.store.prefix_mask(column, operand, rows)
+            else:
+                mask = self.store.match_any_mask(column, operand, rows)
+            rows = np.flatnonzero(mask) if rows is None else rows[mask]
+        return np.arange(len(self.store)) if rows is None else rows
+
+    def sort_keys(self, rows):
+        # A float per row that orders rows as requested, with missing values as +inf so they come last.
+        # Ties are broken by sheet order. Interned columns sort by each value's rank under sort_key.
+        if not self.order_by:
+            keys = rows.astype(np.float64)
+            return -keys if self.descending else keys
+        data, valid = self.store.cells(self.order_by, rows)
+        keys = np.zeros(len(rows), dtype=np.float64)
+        if self.store.is_numeric(self.order_by):
+            keys[:] = data
+            valid = valid & ~np.isnan(keys)
+        else:
+            ranks, _ = self.store.sort_ranks(self.order_by)
+            keys[valid] = ranks[data[valid]]
+        if self.descending:
+            keys = -keys
+        keys[~valid] = np.inf
+        return keys
+
+    def page(self, rows):
+        # The rows of the requested page in order, and the cursor for the page after it ('' if it is the last)
+        keys = self.sort_keys(rows)
+        if self.cursor is not None:
+            cursor_key, cursor_row = self.cursor_position()
+            after = (keys > cursor_key) | ((keys == cursor_key) & (rows > cursor_row))
+            rows, keys = rows[after], keys[after]
+        more = bool(self.limit) and len(rows) > self.limit
+        if more:
+            # Only rows that could make the page need sorting: those keyed at or below the limit-th key
+            threshold = np.partition(keys, self.limit - 1)[self.limit - 1]
+            candidates = keys <= threshold
+            rows, keys = rows[candidates], keys[candidates]
+        page = rows[np.lexsort((rows, keys))[:self.limit or None]]
+        return page, self.encode_cursor(int(page[-1])) if more else ''
+
+    def encode_cursor(self, row):
+        # The last row of a page and its order_by value, so the next page starts after it even if rows
+        # have been updated since
+        value = None
+        if self.order_by:
+            value = self.store.values_at(self.order_by, [row])[0]
+            if value is not None and not self.store.is_numeric(self.order_by):
+                value = sort_key(value)
+        cursor = json.dumps([self.fingerprint, row, value])
+        return base64.urlsafe_b64encode(cursor.encode()).decode()
+
+    def decode_cursor(self, cursor):
+        try:
+            query_fingerprint, row, value = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except (ValueError, TypeError):
+            raise ValueError("Invalid cursor.")
+        if query_fingerprint != self.fingerprint:
+            raise ValueError("Cursor belongs to a different query.")
+        try:
+            row = int(row)
+            if value is not None:
+                value = float(value) if self.store.is_numeric(self.order_by) else (int(value[0]), str(value[1]))
+        except (ValueError, TypeError, IndexError):
+            raise ValueError("Invalid cursor.")
+        return row, value
+
+    def cursor_position(self):
+        # The cursor as (key, row) in sort_keys' terms
+        row, value = self.cursor
+        if not self.order_by:
+            key = float(row)
+        elif value is None:
+            return np.inf, row
+        elif self.store.is_numeric(self.order_by):
+            key = value
+        else:
+            # The value may no longer be in the column: place it between its neighbours' ranks
+            _, sorted_keys = self.store.sort_ranks(self.order_by)
+            rank = bisect.bisect_left(sorted_keys, value)
+            key = rank if rank < len(sorted_keys) and sorted_keys[rank] == value else rank - 0.5
+        return (-key if self.descending else key), row
+
+    def rows(self, rows):
+        # QueryRow messages for rows, holding the projected columns
+        values = [self.store.values_at(column, rows) for column in self.columns]
+        return [inventory_pb2.QueryRow(values=[query_value(value) for value in row]) for row in zip(*values)]
@@ -1,58 +1,327 @@
 from concurrent import futures
+import argparse
 import grpc
 import pandas as pd
 import inventory_pb2
 import inventory_pb2_grpc
 import numpy as np
 import math
+import os
+import signal
+import threading
+from inventory_index import HashIndex, IdIndex, SortedIndex, column_codes
+from persistence import WriteBehindLog, fsync_path
+import snapshot
+import excel_loader
+from rwlock import ReadWriteLock
+from lru import LRUCache
+from query_cache import QueryCache
+from metrics import ServerMetrics, MetricsInterceptor
+from profiler import CallProfiler, ProfilingInterceptor
+from change_feed import ChangeFeed
+from query_planner import Query
+import aggregation
+import columnar
+from compression import CompressionInterceptor, parse_method_compression
+
+# Columns whose secondary search index is built when the data is loaded.
+# Other columns get an index the first time search() is asked about them, unless lazy_indexes is off.
+# Only text columns are indexed; numeric ones are searched with a vectorized mask.
+DEFAULT_INDEXED_COLUMNS = ('Name',)
+
+# Numeric columns whose sorted index for searchRange is built when the data is loaded
+DEFAULT_RANGE_COLUMNS = ('Price', 'Quantity_in_Stock', 'Quantity_in_Reorder')
+
+# Updates are written to the workbook once this many are pending, or after this many seconds
+DEFAULT_FLUSH_BATCH_SIZE = 100
+DEFAULT_FLUSH_INTERVAL = 5.0
+
+# Seconds in-flight RPCs get to finish on shutdown
+SHUTDOWN_GRACE = 5
+
+# Ready-built InventoryRecord messages kept for the most recently served rows
+DEFAULT_RECORD_CACHE_SIZE = 100000
+
+# Cached search/getDistribution answers, and optionally how many seconds each may be served for
+DEFAULT_QUERY_CACHE_SIZE = 10000
+DEFAULT_QUERY_CACHE_TTL = None
+
+# Columns that make up an InventoryRecord; a cached search answer depends on all of them
+RECORD_COLUMNS = ('Inventory_ID', 'Name', 'Description', 'Price', 'Quantity_in_Stock', 'Quantity_in_Reorder',
+                  'Discontinued')
+
+# Accept the keepalive pings pooled clients send on idle connections (see inventory_client.py) instead of
+# closing those connections for pinging too often, and allow messages as large as the clients do
+SERVER_OPTIONS = [
+    ('grpc.keepalive_permit_without_calls', 1),
+    ('grpc.http2.min_ping_interval_without_data_ms', 10000),
+    ('grpc.max_send_message_length', 64 * 1024 * 1024),
+    ('grpc.max_receive_message_length', 64 * 1024 * 1024),
+]
+
+# Where setProfiling writes profiles, relative to the server's working directory
+DEFAULT_PROFILE_DIRECTORY = 'profiles'
+
+# Change events a watchChanges stream may fall behind by before it is ended, and how often an idle
+# stream checks whether its client is still there
+WATCH_QUEUE_SIZE = 10000
+WATCH_POLL_INTERVAL = 1.0
+
+# In the thread-pool servers each watchChanges stream holds a handler thread for as long as it lasts, so
+# only max_workers // WORKERS_PER_WATCHER of them are let in at once; the rest get RESOURCE_EXHAUSTED.
+# The aio server has no such limit.
+WORKERS_PER_WATCHER = 4
+
+# searchRange and query read rows under the read lock this many at a time, so long streams don't hold off update
+STREAM_CHUNK_SIZE = 64
+
+# Records per searchRangeBatches message when the request doesn't say, and the most it may ask for
+DEFAULT_RANGE_BATCH_SIZE = 512
+MAX_RANGE_BATCH_SIZE = 16384
+
+# Rows per export ColumnChunk when the request doesn't say, and the most it may ask for (8 MiB of a numeric column)
+DEFAULT_EXPORT_CHUNK_ROWS = 65536
+MAX_EXPORT_CHUNK_ROWS = 1048576
+
+
+def build_indexes(store, indexed_columns=DEFAULT_INDEXED_COLUMNS, range_columns=DEFAULT_RANGE_COLUMNS):
+    # The indexes a servicer with these columns starts with, for saving in a snapshot of store
+    return ([IdIndex('Inventory_ID').build(store)] +
+            [HashIndex(column).build(store) for column in indexed_columns if column_codes(store, column)] +
+            [SortedIndex(column).build(store) for column in range_columns])
+
+
+class UpdateRejected(Exception):
+    # An update refused before anything was changed, with the status and details for its caller
+
+    def __init__(self, code, details):
+        super().__init__(details)
+        self.code = code
+        self.details = details
+
 
 class InventoryServiceServicer(inventory_pb2_grpc.InventoryServiceServicer):
-    def __init__(self, excel_file_path):
+    def __init__(self, excel_file_path, indexed_columns=DEFAULT_INDEXED_COLUMNS,
+                 range_columns=DEFAULT_RANGE_COLUMNS, lazy_indexes=True,
+                 flush_batch_size=DEFAULT_FLUSH_BATCH_SIZE, flush_interval=DEFAULT_FLUSH_INTERVAL,
+                 change_log=None, record_cache_size=DEFAULT_RECORD_CACHE_SIZE,
+                 query_cache_size=DEFAULT_QUERY_CACHE_SIZE, query_cache_ttl=DEFAULT_QUERY_CACHE_TTL,
+                 max_watchers=None, coordinator=None):
         self.excel_file_path = excel_file_path
-        self.inventory_data = self.load_inventory_data()
+        # In prefork mode, the process that applies updates for every worker (see prefork.py)
+        self.coordinator = coordinator
+        self.indexed_columns = indexed_columns
+        self.range_columns = range_columns
+        self.lazy_indexes = lazy_indexes
+        # Guards inventory_data and every index: RPCs that only read share it, update takes it exclusively
+        self.lock = ReadWriteLock()
+        self.inventory_data, saved_indexes = self.load_inventory_data()
+        self.record_cache = LRUCache(record_cache_size)
+        self.query_cache = QueryCache(query_cache_size, query_cache_ttl)
+        # Bumped whenever update changes a column, so cached query answers over it go stale
+        self.column_versions = {}
+        # Filled in by MetricsInterceptor and reported by getStats
+        self.metrics = ServerMetrics()
+        # Off until setProfiling turns it on; fed by ProfilingInterceptor
+        self.profiler = CallProfiler(DEFAULT_PROFILE_DIRECTORY)
+        # Tells watchChanges subscribers which rows each update touched
+        self.change_feed = ChangeFeed(WATCH_QUEUE_SIZE)
+        # Places for concurrent watchChanges streams; None for no limit
+        self.watch_slots = threading.BoundedSemaphore(max_watchers) if max_watchers is not None else None
+
+        # Indexes saved with the snapshot are taken as they are; the rest are built
+        self.id_index = self.make_index(IdIndex, 'Inventory_ID', saved_indexes)
+        self.secondary_indexes = {}
+        # One lock per lazily indexed column, so concurrent first searches build its index once
+        self.index_locks = {}
+        self.index_locks_lock = threading.Lock()
+        for column in indexed_columns:
+            if column_codes(self.inventory_data, column):
+                self.secondary_indexes[column] = self.make_index(HashIndex, column, saved_indexes)
+        self.range_indexes = {}
+        for column in range_columns:
+            self.range_indexes[column] = self.make_index(SortedIndex, column, saved_indexes)
+        if saved_indexes is None:
+            # Parsed from the workbook: save it, indexes and all, for the next start
+            self.write_snapshot(self.inventory_data, self.current_indexes())
+
+        if change_log is not None:
+            # Another process owns persistence (see prefork.py)
+            self.change_log = change_log
+        else:
+            # Reapply updates that were logged but had not reached the workbook when the server last stopped.
+            # They go through apply_change so the indexes follow them.
+            self.change_log = WriteBehindLog(excel_file_path + '.changes', self.inventory_data.copy,
+                                             self.write_workbook, flush_batch_size, flush_interval,
+                                             consistent=self.lock.read)
+            for change in self.change_log.replay():
+                self.apply_change(change['row'], change['column'], change['value'])
+            self.change_log.start()
 
     def load_inventory_data(self):
-        df = pd.read_excel(self.excel_file_path)
-        return df.to_dict(orient='records')
+        # The store and the index arrays saved with it (see snapshot.load), or None for them when the store
+        # was parsed from the workbook.
+        # Start from the binary snapshot when it is at least as new as the workbook
+        snapshot_path = self.excel_file_path + '.snapshot'
+        if snapshot.is_fresh(snapshot_path, self.excel_file_path):
+            try:
+                return snapshot.load(snapshot_path)
+            except (OSError, ValueError, KeyError) as error:
+                print(f"Ignoring unreadable snapshot '{snapshot_path}': {error}")
+        # Every column is kept, not just the ones in InventoryRecord: update may set any of them and the
+        # workbook is rewritten from this store
+        return excel_loader.load(self.excel_file_path, progress=self.report_progress), None
+
+    def report_progress(self, loaded, total):
+        print(f"Loaded {loaded} of {total} rows from '{self.excel_file_path}'")
+
+    def write_snapshot(self, store, indexes):
+        try:
+            snapshot.save(store, self.excel_file_path + '.snapshot', indexes)
+        except (OSError, TypeError) as error:
+            # Not fatal: the next start just parses the workbook again
+            print(f"Could not write inventory snapshot: {error}")
+
+    def make_index(self, index_class, column, saved_indexes):
+        arrays = (saved_indexes or {}).get((index_class.__name__, column))
+        if arrays is not None:
+            try:
+                return index_class(column).load(self.inventory_data, arrays)
+            except KeyError:
+                pass  # Saved without an array this version keeps
+        return index_class(column).build(self.inventory_data)
+
+    def current_indexes(self):
+        return [self.id_index] + list(self.secondary_indexes.values()) + list(self.range_indexes.values())
+
+    def build_id_index(self):
+        # Map each Inventory_ID to its row position so ID lookups don't scan the whole table
+        return IdIndex('Inventory_ID').build(self.inventory_data)
+
+    def build_secondary_index(self, column):
+        index = HashIndex(column).build(self.inventory_data)
+        self.secondary_indexes[column] = index
+        return index
+
+    def get_secondary_index(self, column):
+        # Call under the read lock, with column known to be in the store
+        index = self.secondary_indexes.get(column)
+        if index is None and self.lazy_indexes and column_codes(self.inventory_data, column):
+            with self.index_lock(column):
+                index = self.secondary_indexes.get(column)
+                if index is None:
+                    index = self.build_secondary_index(column)
+        return index
+
+    def index_lock(self, column):
+        with self.index_locks_lock:
+            return self.index_locks.setdefault(column, threading.Lock())
+
+    def build_range_index(self, column):
+        index = SortedIndex(column).build(self.inventory_data)
+        self.range_indexes[column] = index
+        return index
+
+    def get_range_index(self, column):
+        # Call under the read lock. Only numeric columns of the store get one.
+        index = self.range_indexes.get(column)
+        if (index is None and self.lazy_indexes and column in self.inventory_data
+                and self.inventory_data.is_numeric(column)):
+            with self.index_lock(column):
+                index = self.range_indexes.get(column)
+                if index is None:
+                    index = self.build_range_index(column)
+        return index
+
+    def search_index(self, column):
+        # The index search() looks column up in: the primary key index answers for the ID column unless it
+        # has a secondary index of its own, so a search never builds a second index over it
+        if (column == self.id_index.column and column not in self.secondary_indexes
+                and column_codes(self.inventory_data, column)):
+            return self.id_index
+        return self.get_secondary_index(column)
+
+    def find_by_id(self, inventory_id):
+        index = self.id_index.get(inventory_id)
+        return self.inventory_data.row(index) if index is not None else None
+
+    def versions_of(self, columns):
+        return tuple(self.column_versions.get(column, 0) for column in columns)
+
+    def get_record(self, index):
+        # InventoryRecord for a row, built once and reused until update invalidates it.
+        # Call under the read lock, so a record can't be cached after an update has invalidated it.
+        record = self.record_cache.get(index)
+        if record is None:
+            record = self.make_record(self.inventory_data.row(index))
+            self.record_cache.put(index, record)
+        return record
+
+    def record_by_id(self, inventory_id):
+        index = self.id_index.get(inventory_id)
+        return self.get_record(index) if index is not None else None
+
+    def reindex_value(self, index, column, old_value, new_value, old_code, column_changed=False):
+        # old_code is the cell's category code before the change (see ColumnStore.code)
+        if column_changed:
+            # Every value in the column may now be stored differently, so start its indexes afresh
+            if column == 'Inventory_ID':
+                self.id_index = self.build_id_index()
+            if column in self.secondary_indexes:
+                self.build_secondary_index(column)
+            if column in self.range_indexes:
+                self.build_range_index(column)
+            return
+        new_code = self.inventory_data.code(index, column)
+        if column == 'Inventory_ID':
+            self.id_index.move(index, old_code, new_code)
+        if column in self.secondary_indexes:
+            self.secondary_indexes[column].move(index, old_code, new_code)
+        if column in self.range_indexes:
+            self.range_indexes[column].move(index, old_value, new_value)
+
+    def make_record(self, found_inventory):
+        # Convert a found inventory row to an InventoryRecord message
+        discontinued_value = found_inventory.get('Discontinued')
+
+        # Check if the Discontinued value is None or an empty string
+        if discontinued_value is None or str(discontinued_value).strip() == "":
+            discontinued_bool = False  # Set to False for empty values
+        else:
+            # Check if the Discontinued value is a number (float)
+            if isinstance(discontinued_value, (int, float)):
+                discontinued_bool = bool(discontinued_value)
+            else:
+                # Check if the Discontinued value is "yes"
+                if str(discontinued_value).strip().lower() == "yes":
+                    discontinued_bool = True
+                else:
+                    try:
+                        # Check if the Discontinued value is NaN
+                        discontinued_bool = math.isnan(float(discontinued_value))
+                    except (TypeError, ValueError):
+                        # If it's not a number or cannot be converted to NaN, set to False
+                        discontinued_bool = False
+
+        return inventory_pb2.InventoryRecord(
+            Inventory_ID=str(found_inventory['Inventory_ID']),
+            Name=found_inventory['Name'],
+            Description=found_inventory['Description'],
+            Price=float(found_inventory['Price']),
+            Quantity_in_Stock=int(found_inventory['Quantity_in_Stock']),
+            Quantity_in_Reorder=int(found_inventory['Quantity_in_Reorder']),
+            Discontinued=discontinued_bool
+        )
 
     def searchByID(self, request, context):
         inventory_id = request.id
 
-        # Search for the Inventory ID in the local data
-        found_inventory = next((item for item in self.inventory_data if item['Inventory_ID'] == inventory_id), None)
-
-        if found_inventory:
-            # Convert the found inventory data to an InventoryRecord message
-            discontinued_value = found_inventory.get('Discontinued')
+        # Look up the Inventory ID in the primary-key index
+        with self.lock.read():
+            found_record = self.record_by_id(inventory_id)
 
-            # Check if the Discontinued value is None or an empty string
-            if discontinued_value is None or str(discontinued_value).strip() == "":
-                discontinued_bool = False  # Set to False for empty values
-            else:
-                # Check if the Discontinued value is a number (float)
-                if isinstance(discontinued_value, (int, float)):
-                    discontinued_bool = bool(discontinued_value)
-                else:
-                    # Check if the Discontinued value is "yes"
-                    if str(discontinued_value).strip().lower() == "yes":
-                        discontinued_bool = True
-                    else:
-                        try:
-                            # Check if the Discontinued value is NaN
-                            discontinued_bool = math.isnan(float(discontinued_value))
-                        except (TypeError, ValueError):
-                            # If it's not a number or cannot be converted to NaN, set to False
-                            discontinued_bool = False
-
-            return inventory_pb2.InventoryRecord(
-                Inventory_ID=str(found_inventory['Inventory_ID']),
-                Name=found_inventory['Name'],
-                Description=found_inventory['Description'],
-                Price=float(found_inventory['Price']),
-                Quantity_in_Stock=int(found_inventory['Quantity_in_Stock']),
-                Quantity_in_Reorder=int(found_inventory['Quantity_in_Reorder']),
-                Discontinued=discontinued_bool
-            )
+        if found_record:
+            return found_record
         else:
             context.set_code(grpc.StatusCode.NOT_FOUND)
             context.set_details(f"Inventory ID '{inventory_id}' not found.")
@@ -61,8 +330,9 @@ class InventoryServiceServicer(inventory_pb2_grpc.InventoryServiceServicer):
     def searchFullRowByID(self, request, context):
         inventory_id = request.id
 
-        # Search for the Inventory ID in the local data
-        found_inventory = next((item for item in self.inventory_data if item['Inventory_ID'] == inventory_id), None)
+        # Look up the Inventory ID in the primary-key index
+        with self.lock.read():
+            found_inventory = self.find_by_id(inventory_id)
 
         if found_inventory:
             # Return the entire row of data for the found inventory as a dictionary
@@ -81,120 +351,418 @@ class InventoryServiceServicer(inventory_pb2_grpc.InventoryServiceServicer):
             return {}  # Return an empty dictionary
 
     def search(self, request, context):
+        versions = self.versions_of(RECORD_COLUMNS + (request.key_name,))
+        return self.query_cache.call('search', request, context, versions, self.run_search)
+
+    def run_search(self, request, context):
         key_name = request.key_name
         key_value = str(request.key_value).lstrip('$')  # Convert to string and remove dollar sign
 
-        # Search for the key and value in the local data
-        found_inventory = next(
-            (item for item in self.inventory_data if str(item.get(key_name)).lstrip('$') == key_value), None)
+        # Search for the key and value through the column's secondary index, or a vectorized scan if it has none
+        with self.lock.read():
+            if key_name not in self.inventory_data:
+                context.set_code(grpc.StatusCode.NOT_FOUND)
+                context.set_details(f"Key '{key_name}' not found in the inventory data.")
+                return inventory_pb2.InventoryRecord()
+            index = self.search_index(key_name)
+            if index is not None:
+                position = index.first(key_value)
+            else:
+                matches = np.flatnonzero(self.inventory_data.match_mask(key_name, key_value))
+                position = matches[0] if len(matches) else None
+            found_record = self.get_record(position) if position is not None else None
 
-        if found_inventory:
-            # Convert the found inventory data to an InventoryRecord message
-            return inventory_pb2.InventoryRecord(
-                Inventory_ID=str(found_inventory['Inventory_ID']),
-                Name=found_inventory['Name'],
-                Description=found_inventory['Description'],
-                Price=float(found_inventory['Price']),
-                Quantity_in_Stock=int(found_inventory['Quantity_in_Stock']),
-                Quantity_in_Reorder=int(found_inventory['Quantity_in_Reorder']),
-                Discontinued=bool(found_inventory['Discontinued']) if 'Discontinued' in found_inventory else False
-            )
+        if found_record:
+            return found_record
         else:
             context.set_code(grpc.StatusCode.NOT_FOUND)
             context.set_details(f"Key '{key_name}' with value '{key_value}' not found.")
             return inventory_pb2.InventoryRecord()  # Return an empty InventoryRecord
 
     def searchRange(self, request, context):
+        for matching_records in self.range_records(request, context, STREAM_CHUNK_SIZE):
+            yield from matching_records
+
+    def searchRangeBatches(self, request, context):
+        # searchRange with many records per message, which costs less per record to frame, send and, with
+        # compression on, compress well together
+        if request.batch_size < 0:
+            context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+            context.set_details(f"Batch size must not be negative, got {request.batch_size}.")
+            return
+        batch_size = min(request.batch_size or DEFAULT_RANGE_BATCH_SIZE, MAX_RANGE_BATCH_SIZE)
+        for matching_records in self.range_records(request, context, batch_size):
+            yield inventory_pb2.InventoryRecords(records=matching_records)
+
+    def range_records(self, request, context, chunk_size):
+        # Lists of up to chunk_size records with key_name between the two key values, in the column's order
         key_name = request.key_name
         key_value_start = request.key_value_start
         key_value_end = request.key_value_end
+        if key_name not in self.inventory_data:
+            context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+            context.set_details(f"Key '{key_name}' not found in the inventory data.")
+            return
 
         # Convert key values to float for numeric comparisons
         key_value_start = float(key_value_start)
         key_value_end = float(key_value_end)
 
-        # Search for the key within the specified range in the local data
-        matching_inventory = [
-            item for item in self.inventory_data
-            if key_name in item and
-               isinstance(item[key_name], (int, float)) and
-               key_value_start <= float(item[key_name]) <= key_value_end
-        ]
-
-        for found_inventory in matching_inventory:
-            # Convert the found inventory data to an InventoryRecord message
-            yield inventory_pb2.InventoryRecord(
-                Inventory_ID=str(found_inventory['Inventory_ID']),
-                Name=found_inventory['Name'],
-                Description=found_inventory['Description'],
-                Price=float(found_inventory['Price']),
-                Quantity_in_Stock=int(found_inventory['Quantity_in_Stock']),
-                Quantity_in_Reorder=int(found_inventory['Quantity_in_Reorder']),
-                Discontinued=bool(found_inventory['Discontinued']) if 'Discontinued' in found_inventory else False
-            )
+        # Slice the column's sorted index between two binary searches, or a vectorized mask if it has none
+        with self.lock.read():
+            index = self.get_range_index(key_name)
+            if index is not None:
+                positions = index.between(key_value_start, key_value_end)
+            else:
+                positions = np.flatnonzero(self.inventory_data.range_mask(key_name, key_value_start, key_value_end))
+
+        for chunk_start in range(0, len(positions), chunk_size):
+            with self.lock.read():
+                matching_records = [self.get_record(position)
+                                    for position in positions[chunk_start:chunk_start + chunk_size]]
+
+            yield matching_records
+
+    def query(self, request, context):
+        # Rows matching every predicate, found and ordered under one read lock (see query_planner.py), then
+        # streamed STREAM_CHUNK_SIZE rows per message. Only existing indexes are used, none are built.
+        with self.lock.read():
+            try:
+                query = Query(request, self.inventory_data)
+            except ValueError as error:
+                context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+                context.set_details(str(error))
+                return
+            candidates, predicates, plan = query.plan(self.id_index, self.secondary_indexes, self.range_indexes)
+            page, next_cursor = query.page(query.matching_rows(candidates, predicates))
+
+        for chunk_start in range(0, max(len(page), 1), STREAM_CHUNK_SIZE):
+            with self.lock.read():
+                result = inventory_pb2.QueryResult(rows=query.rows(page[chunk_start:chunk_start + STREAM_CHUNK_SIZE]))
+            if chunk_start == 0:
+                result.columns.extend(query.columns)
+                result.plan = plan
+            if chunk_start + STREAM_CHUNK_SIZE >= len(page):
+                result.next_cursor = next_cursor
+            yield result
 
     def getDistribution(self, request, context):
+        versions = self.versions_of((request.key_name,))
+        return self.query_cache.call('getDistribution', request, context, versions, self.run_distribution)
+
+    def run_distribution(self, request, context):
         key_name = request.key_name
         percentile = request.percentile
 
-        # Extract the values for the specified key from the local data
-        values = [item.get(key_name, 0) for item in self.inventory_data]
-
-        if not values:
+        if key_name not in self.inventory_data:
             context.set_code(grpc.StatusCode.NOT_FOUND)
             context.set_details(f"Key '{key_name}' not found in the inventory data.")
-            return inventory_pb2.DistributionResponse(value=None)
+            return inventory_pb2.DistributionResponse()
+        if not self.inventory_data.is_numeric(key_name):
+            context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+            context.set_details(f"Key '{key_name}' is not numeric.")
+            return inventory_pb2.DistributionResponse()
+        if not 0 <= percentile <= 100:
+            context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+            context.set_details(f"Percentile {percentile} is outside 0-100.")
+            return inventory_pb2.DistributionResponse()
+
+        # Read the percentile off the column's sorted index, which update keeps current.
+        # Without one, fall back to numpy.percentile over the column's non-missing values.
+        with self.lock.read():
+            index = self.get_range_index(key_name)
+            if index is not None:
+                result = index.percentile(percentile)
+            else:
+                values, mask = self.inventory_data.numeric_view(key_name)
+                result = self.calculate_percentile(values[mask], percentile) if mask.any() else None
 
-        # Calculate the percentile value with numpy.percentile
-        result = self.calculate_percentile(values, percentile)
+        if result is None:
+            context.set_code(grpc.StatusCode.NOT_FOUND)
+            context.set_details(f"Key '{key_name}' has no values in the inventory data.")
+            return inventory_pb2.DistributionResponse()
 
         return inventory_pb2.DistributionResponse(value=result)
 
+    def aggregate(self, request, context):
+        columns = tuple(request.columns) + (request.group_by,) + tuple(predicate.column for predicate in request.where)
+        return self.query_cache.call('aggregate', request, context, self.versions_of(columns), self.run_aggregate)
+
+    def run_aggregate(self, request, context):
+        # Several statistics of several columns, per group, over the rows query would select for request.where
+        with self.lock.read():
+            try:
+                aggregation.check_request(request, self.inventory_data)
+                query = Query(inventory_pb2.QueryRequest(where=request.where), self.inventory_data)
+            except ValueError as error:
+                context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+                context.set_details(str(error))
+                return inventory_pb2.AggregateResponse()
+            candidates, predicates, _ = query.plan(self.id_index, self.secondary_indexes, self.range_indexes)
+            return aggregation.aggregate(self.inventory_data, query.matching_rows(candidates, predicates), request)
+
+    def export(self, request, context):
+        # Whole columns in packed chunks (see columnar.py). The columns are copied under one read lock, so the
+        # export is one consistent point in time however long the client takes to read it.
+        if request.chunk_rows < 0:
+            context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+            context.set_details(f"Chunk rows must not be negative, got {request.chunk_rows}.")
+            return
+        chunk_rows = min(request.chunk_rows or DEFAULT_EXPORT_CHUNK_ROWS, MAX_EXPORT_CHUNK_ROWS)
+        with self.lock.read():
+            columns = list(request.columns) or list(self.inventory_data.columns)
+            unknown = [column for column in columns if column not in self.inventory_data]
+            if unknown:
+                context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+                context.set_details(f"Unknown column '{unknown[0]}'.")
+                return
+            arrays = [(column,) + self.inventory_data.column_arrays(column) for column in columns]
+
+        yield from columnar.export_chunks(arrays, chunk_rows)
+
     def calculate_percentile(self, values, percentile):
         # Use numpy.percentile for accurate percentile calculation
-        result = np.percentile(values, percentile, interpolation='linear')
+        result = np.percentile(values, percentile, method='linear')
 
         return result
 
     def update(self, request, context):
-        key_name = request.key_name
-        key_value = request.key_value
-        val_name = request.val_name
-        val_val_new = request.val_val_new
-
-        # Find the record with the given key name and key value
-        record_index = next((index for index, item in enumerate(self.inventory_data)
-                             if item.get(key_name) == key_value), None)
-
-        if record_index is not None:
-            # Update the specified attribute with the new value
-            self.inventory_data[record_index][val_name] = val_val_new
-
-            # Save the updated data back to the Excel file
-            self.save_inventory_data()
-
-            return inventory_pb2.UpdateResponse(success=True)
-        else:
-            context.set_code(grpc.StatusCode.NOT_FOUND)
-            context.set_details(f"Record with '{key_name}'='{key_value}' not found.")
+        try:
+            self.submit_updates([request])
+        except UpdateRejected as rejection:
+            context.set_code(rejection.code)
+            context.set_details(rejection.details)
             return inventory_pb2.UpdateResponse(success=False)
+        return inventory_pb2.UpdateResponse(success=True)
+
+    def batchSearchByID(self, request, context):
+        # One record per requested ID, in request order; IDs that aren't found get an empty record
+        with self.lock.read():
+            found = [self.record_by_id(inventory_id) for inventory_id in request.ids]
+
+        return inventory_pb2.InventoryRecords(
+            records=[found_record or inventory_pb2.InventoryRecord() for found_record in found])
+
+    def searchByIDStream(self, request_iterator, context):
+        # Long-lived lookup stream: one result per request, in order, tagged with the request's correlation_id
+        for request in request_iterator:
+            yield self.lookup_result(request)
+
+    def lookup_result(self, request):
+        with self.lock.read():
+            found_record = self.record_by_id(request.id)
+
+        if found_record:
+            return inventory_pb2.InventoryLookupResult(correlation_id=request.correlation_id, found=True,
+                                                       record=found_record)
+        return inventory_pb2.InventoryLookupResult(correlation_id=request.correlation_id, found=False)
+
+    def bulkUpdate(self, request, context):
+        try:
+            self.submit_updates(list(request.updates), numbered=True)
+        except UpdateRejected as rejection:
+            context.set_code(rejection.code)
+            context.set_details(rejection.details)
+            return inventory_pb2.UpdateResponse(success=False)
+        return inventory_pb2.UpdateResponse(success=True)
+
+    def submit_updates(self, updates, numbered=False):
+        # Applies and saves UpdateRequests (see commit_updates) before returning: here, or in prefork mode by
+        # the coordinator process, which every worker hears them from (see prefork.py)
+        if self.coordinator is not None:
+            self.coordinator.submit(updates, numbered)
+            return
+        if self.commit_updates(updates, numbered) is not None:
+            # Make the logged change durable before acknowledging it, without holding off readers
+            self.change_log.sync()
+
+    def commit_updates(self, updates, numbered=False):
+        # All or nothing: every key is resolved and every value checked against the data as it was before
+        # the batch, and only then are the changes applied and logged as a single entry (a list of them when
+        # numbered, i.e. from bulkUpdate). Returns the entry, or None for no updates.
+        # Raises UpdateRejected, its details prefixed with the update's position when numbered.
+        with self.lock.write():
+            changes = []
+            for position, update in enumerate(updates):
+                prefix = f"Update {position}: " if numbered else ""
+                record_index = self.find_record(update.key_name, update.key_value)
+                if record_index is None:
+                    raise UpdateRejected(grpc.StatusCode.NOT_FOUND,
+                                         f"{prefix}Record with '{update.key_name}'='{update.key_value}' not found.")
+                try:
+                    self.inventory_data.check_value(update.val_name, update.val_val_new)
+                except ValueError:
+                    raise UpdateRejected(grpc.StatusCode.INVALID_ARGUMENT,
+                                         f"{prefix}Value '{update.val_val_new}' is not numeric "
+                                         f"for column '{update.val_name}'.")
+                except OverflowError:
+                    raise UpdateRejected(grpc.StatusCode.INVALID_ARGUMENT,
+                                         f"{prefix}Value '{update.val_val_new}' is out of range "
+                                         f"for column '{update.val_name}'.")
+                changes.append({'row': record_index, 'column': update.val_name, 'value': update.val_val_new})
+
+            if not changes:
+                return None
+            # Stored with each column's type; the workbook is rewritten from the log in the background
+            for change in changes:
+                self.apply_change(change['row'], change['column'], change['value'])
+            entry = changes if numbered else changes[0]
+            self.change_log.append(entry)
+            return entry
+
+    def getStats(self, request, context):
+        # Only this process's calls: in prefork mode each worker keeps its own counts
+        return inventory_pb2.ServerStats(uptime_seconds=self.metrics.uptime(), methods=[
+            inventory_pb2.MethodStats(
+                method=method, requests=stats['requests'], in_flight=stats['in_flight'],
+                status_codes=stats['status_codes'], mean_ms=stats['mean_ms'], max_ms=stats['max_ms'],
+                p50_ms=stats['p50_ms'], p90_ms=stats['p90_ms'], p99_ms=stats['p99_ms'], p999_ms=stats['p999_ms'],
+                buckets=[inventory_pb2.LatencyBucket(upper_bound_ms=bound, count=count)
+                         for bound, count in stats['buckets']])
+            for method, stats in self.metrics.snapshot().items()],
+            query_cache=inventory_pb2.QueryCacheStats(**self.query_cache.stats()))
+
+    def setProfiling(self, request, context):
+        # Takes effect from the next call. In prefork mode only the worker that receives it is affected.
+        if request.HasField('sample_rate'):
+            if not 0 <= request.sample_rate <= 1:
+                context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+                context.set_details(f"Sample rate must be between 0 and 1, got {request.sample_rate}.")
+                return inventory_pb2.ProfilingResponse()
+            self.profiler.sample_rate = request.sample_rate
+        profiled_calls = self.profiler.profiled_calls
+        files = []
+        if request.dump:
+            try:
+                files = self.profiler.dump()
+            except OSError as error:
+                context.set_code(grpc.StatusCode.INTERNAL)
+                context.set_details(f"Could not write profiles: {error}")
+                return inventory_pb2.ProfilingResponse()
+        if request.reset:
+            self.profiler.reset()
+        return inventory_pb2.ProfilingResponse(sample_rate=self.profiler.sample_rate, profiled_calls=profiled_calls,
+                                               files=files)
+
+    def watchChanges(self, request, context):
+        # The Inventory_IDs each applied change touches, for client-side caches. The first event is empty and
+        # means the subscription is live. A watcher that falls WATCH_QUEUE_SIZE events behind has its stream
+        # ended with RESOURCE_EXHAUSTED, so it knows to drop what it cached and subscribe again. So is one that
+        # would take more than the server's share of handler threads for watchers (see WORKERS_PER_WATCHER).
+        if self.watch_slots is not None and not self.watch_slots.acquire(blocking=False):
+            context.set_code(grpc.StatusCode.RESOURCE_EXHAUSTED)
+            context.set_details("Too many watchChanges streams on this server; retry later or use the aio server.")
+            return
+        subscription = self.change_feed.subscribe()
+        try:
+            yield inventory_pb2.ChangeEvent(sequence=subscription.start)
+            while context.is_active():
+                event = subscription.get(WATCH_POLL_INTERVAL)
+                if subscription.dropped:
+                    context.set_code(grpc.StatusCode.RESOURCE_EXHAUSTED)
+                    context.set_details("Fell too far behind the change feed; subscribe again.")
+                    return
+                if event is not None:
+                    sequence, inventory_ids, column = event
+                    yield inventory_pb2.ChangeEvent(sequence=sequence, inventory_ids=inventory_ids, column=column)
+        finally:
+            self.change_feed.unsubscribe(subscription)
+            if self.watch_slots is not None:
+                self.watch_slots.release()
+
+    def find_record(self, key_name, key_value):
+        if key_name == 'Inventory_ID':
+            return self.id_index.get(key_value)
+        if key_name in self.secondary_indexes:
+            # The index matches on normalized values, so confirm the exact value on each candidate
+            return next((int(index) for index in self.secondary_indexes[key_name].lookup(key_value)
+                         if self.inventory_data.value(index, key_name) == key_value), None)
+        return self.inventory_data.find_exact(key_name, key_value)
+
+    def apply_change(self, record_index, val_name, val_val_new):
+        old_value = self.inventory_data.value(record_index, val_name)
+        old_code = self.inventory_data.code(record_index, val_name)
+        column_changed = self.inventory_data.set_value(record_index, val_name, val_val_new)
+        self.record_cache.pop(record_index)
+        self.column_versions[val_name] = self.column_versions.get(val_name, 0) + 1
+        new_value = self.inventory_data.value(record_index, val_name)
+        self.reindex_value(record_index, val_name, old_value, new_value, old_code, column_changed)
+        if self.change_feed.subscribers:
+            # A renamed row changes the answer for its old ID as well as its new one
+            changed_ids = {self.inventory_data.value(record_index, 'Inventory_ID')}
+            if val_name == 'Inventory_ID':
+                changed_ids.add(old_value)
+            self.change_feed.publish([str(changed_id) for changed_id in changed_ids if pd.notna(changed_id)],
+                                     val_name)
 
     def save_inventory_data(self):
-        # Save the updated data back to the Excel file
-        updated_df = pd.DataFrame(self.inventory_data)
-        updated_df.to_excel(self.excel_file_path, index=False)
-
-
-def serve():
-    excel_file_path = r'InventoryData.xlsx'
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
-    inventory_service = InventoryServiceServicer(excel_file_path)
+        # Write any logged updates through to the Excel file now
+        self.change_log.flush()
+
+    def write_workbook(self, store):
+        # store is a copy of inventory_data (see WriteBehindLog), converted here, outside the lock.
+        # Write to a temporary file and swap it in, so a crash never leaves a half-written workbook
+        root, extension = os.path.splitext(self.excel_file_path)
+        temporary_path = root + '.tmp' + extension
+        store.to_dataframe().to_excel(temporary_path, index=False, engine='openpyxl')
+        # Durable before the change log is trimmed of what it holds: the file, then its new name
+        fsync_path(temporary_path)
+        os.replace(temporary_path, self.excel_file_path)
+        fsync_path(os.path.dirname(os.path.abspath(self.excel_file_path)))
+        # Refresh the snapshot after the workbook so it is the newer of the two
+        self.write_snapshot(store, build_indexes(store, self.indexed_columns, self.range_columns))
+
+    def close(self):
+        self.change_log.close()
+
+
+def serve(excel_file_path='InventoryData.xlsx', port=50051, max_workers=10, method_compression=None):
+    # method_compression maps method names ('*' for the rest) to 'gzip', 'deflate' or 'none' for responses
+    inventory_service = InventoryServiceServicer(excel_file_path, max_watchers=max_workers // WORKERS_PER_WATCHER)
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=max_workers), options=SERVER_OPTIONS,
+                         interceptors=[MetricsInterceptor(inventory_service.metrics),
+                                       ProfilingInterceptor(inventory_service.profiler),
+                                       CompressionInterceptor(method_compression or {})])
     inventory_pb2_grpc.add_InventoryServiceServicer_to_server(inventory_service, server)
-    server.add_insecure_port('[::]:50051')  # Bind to port 50051 on all interfaces
+    server.add_insecure_port(f'[::]:{port}')  # Bind to the port on all interfaces
     server.start()
     print("gRPC Server is running ............ \n")
-    server.wait_for_termination()
+
+    # Stop cleanly on SIGTERM as well as Ctrl+C so pending updates reach the workbook
+    signal.signal(signal.SIGTERM, lambda signum, frame: server.stop(SHUTDOWN_GRACE))
+    try:
+        server.wait_for_termination()
+    except KeyboardInterrupt:
+        server.stop(SHUTDOWN_GRACE).wait()
+    inventory_service.close()
     print("gRPC Server terminated !!!")
 
+
+def main():
+    parser = argparse.ArgumentParser(description='Inventory gRPC server')
+    parser.add_argument('--mode', choices=('sync', 'aio', 'prefork'), default='sync',
+                        help='thread-pool grpc.server (sync), grpc.aio event loop (aio), '
+                             'or several sync worker processes sharing the port (prefork)')
+    parser.add_argument('--data', default='InventoryData.xlsx', help='inventory workbook')
+    parser.add_argument('--port', type=int, default=50051)
+    parser.add_argument('--max-workers', type=int, default=10,
+                        help='thread pool size in sync and prefork modes; each watchChanges stream holds a thread, '
+                             f'so at most max_workers // {WORKERS_PER_WATCHER} of them are accepted per process')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='worker processes in prefork mode')
+    parser.add_argument('--compression', type=parse_method_compression, default={},
+                        help='response compression per method, e.g. searchRange=gzip,query=deflate; '
+                             '* covers every other method, and clients can choose per call')
+    args = parser.parse_args()
+
+    if args.mode == 'aio':
+        import asyncio
+        from aio_server import serve_aio
+        asyncio.run(serve_aio(args.data, args.port, args.compression))
+    elif args.mode == 'prefork':
+        from prefork import serve_prefork
+        serve_prefork(args.data, args.port, args.workers, args.max_workers, args.compression)
+    else:
+        serve(args.data, args.port, args.max_workers, args.compression)
+
 if __name__ == "__main__":
-    serve()
\ No newline at end of file
+    main()
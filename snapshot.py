@@ -0,0 +1,103 @@
+import json
+import os
+import struct
+import numpy as np
+from inventory_index import KeyTable
+from inventory_store import ColumnStore, PackedCategories
+
+# Binary snapshot of a ColumnStore and its indexes, so the server can start without parsing the workbook
+# or building indexes. Layout: magic, 8-byte header length, JSON header, then each array's raw bytes at an
+# aligned offset. Interned columns keep their categories as PackedCategories arrays and their KeyTable.
+# Arrays are memory-mapped copy-on-write on load: pages are read lazily and updates stay private.
+MAGIC = b'INVSNAP2'
+ALIGNMENT = 64
+
+
+def is_fresh(snapshot_path, excel_file_path):
+    # A snapshot is only trusted when it was written after the workbook last changed
+    return (os.path.exists(snapshot_path) and
+            os.path.getmtime(snapshot_path) >= os.path.getmtime(excel_file_path))
+
+
+def aligned(size):
+    return -(-size // ALIGNMENT) * ALIGNMENT
+
+
+def save(store, snapshot_path, indexes=()):
+    # indexes are built over store (see inventory_index.py). Raises TypeError for categories
+    # PackedCategories can't hold.
+    arrays = []
+    offset = 0
+
+    def layout(named_arrays):
+        nonlocal offset
+        layouts = {}
+        for name, array in named_arrays.items():
+            layouts[name] = {'dtype': array.dtype.str, 'offset': offset, 'length': len(array)}
+            arrays.append((offset, np.ascontiguousarray(array)))
+            offset += aligned(array.nbytes)
+        return layouts
+
+    columns = []
+    for column in store.columns:
+        if store.is_numeric(column):
+            columns.append({'name': column, 'kind': 'numeric',
+                            'arrays': layout({'values': store.numeric[column], 'valid': store.valid[column]})})
+            continue
+        categories = PackedCategories.pack(store.categories[column])
+        table = store.key_tables.get(column)
+        if table is None or table.added:
+            table = KeyTable.build(store.categories[column])
+        columns.append({'name': column, 'kind': 'interned', 'mask': table.mask,
+                        'arrays': layout({'codes': store.codes[column], 'valid': store.valid[column],
+                                          'offsets': categories.offsets, 'data': categories.data,
+                                          'kinds': categories.kinds, 'slots': table.slots})})
+    saved_indexes = [{'kind': type(index).__name__, 'column': index.column, 'arrays': layout(index.arrays())}
+                     for index in indexes]
+    header = json.dumps({'length': len(store), 'columns': columns, 'indexes': saved_indexes}).encode('utf-8')
+    data_start = aligned(len(MAGIC) + 8 + len(header))
+
+    # Write beside the target and swap it in so readers never see a partial snapshot
+    # Several processes may regenerate it at once in prefork mode, so the temporary name is per process
+    temporary_path = f'{snapshot_path}.{os.getpid()}.tmp'
+    with open(temporary_path, 'wb') as snapshot_file:
+        snapshot_file.write(MAGIC + struct.pack('<Q', len(header)) + header)
+        for array_offset, array in arrays:
+            snapshot_file.seek(data_start + array_offset)
+            snapshot_file.write(array.tobytes())
+        snapshot_file.truncate(data_start + offset)
+        snapshot_file.flush()
+        os.fsync(snapshot_file.fileno())
+    os.replace(temporary_path, snapshot_path)
+
+
+def load(snapshot_path):
+    # Returns the store and the arrays of the indexes saved with it, keyed by (index class name, column)
+    with open(snapshot_path, 'rb') as snapshot_file:
+        if snapshot_file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"'{snapshot_path}' is not an inventory snapshot.")
+        header_length, = struct.unpack('<Q', snapshot_file.read(8))
+        header = json.loads(snapshot_file.read(header_length))
+    data_start = aligned(len(MAGIC) + 8 + header_length)
+
+    def mapped(layouts):
+        arrays = {}
+        for name, layout in layouts.items():
+            if layout['length']:
+                arrays[name] = np.memmap(snapshot_path, dtype=np.dtype(layout['dtype']), mode='c',
+                                         offset=data_start + layout['offset'], shape=(layout['length'],))
+            else:
+                arrays[name] = np.zeros(0, dtype=np.dtype(layout['dtype']))
+        return arrays
+
+    store = ColumnStore(header['length'])
+    for entry in header['columns']:
+        arrays = mapped(entry['arrays'])
+        if entry['kind'] == 'numeric':
+            store.add_numeric(entry['name'], arrays['values'], arrays['valid'])
+        else:
+            categories = PackedCategories(arrays['offsets'], arrays['data'], arrays['kinds'])
+            store.add_interned(entry['name'], arrays['codes'], categories, arrays['valid'])
+            store.key_tables[entry['name']] = KeyTable(arrays['slots'], entry['mask'])
+    indexes = {(entry['kind'], entry['column']): mapped(entry['arrays']) for entry in header['indexes']}
+    return store, indexes
@@ -0,0 +1,135 @@
+import random
+import numpy as np
+import pandas as pd
+import pytest
+from inventory_index import HashIndex, IdIndex, KeyTable, SortedIndex, normalize_key
+from inventory_store import ColumnStore
+
+# Indexes kept up to date with move() after each update must match the same index built afresh over the
+# updated store.
+
+NAMES = ['Bolt', 'Nut', '$Bolt', 'Washer', '12', '']
+VALUES = NAMES + ['IN0001', 'IN0002', '$IN0003', 'nan', '7', '3.5', '-2', 'X']
+
+
+def make_store(rows=40, seed=0):
+    rng = random.Random(seed)
+    # Duplicate IDs, including ones that only differ by a leading dollar sign, and a missing one
+    ids = ['IN%04d' % rng.randrange(rows // 2) for _ in range(rows)]
+    ids[1] = '$' + ids[0]
+    ids[2] = None
+    return ColumnStore.from_dataframe(pd.DataFrame({
+        'Inventory_ID': ids,
+        'Name': [rng.choice(NAMES + [None]) for _ in range(rows)],
+        'Price': [rng.choice([1.5, 2.0, float('nan'), -3.25]) for _ in range(rows)],
+        'Quantity_in_Stock': [rng.randrange(5) for _ in range(rows)],
+    }))
+
+
+def update(store, indexes, index, column, raw_value):
+    # What the server does for one change (see apply_change and reindex_value)
+    old_value = store.value(index, column)
+    old_code = store.code(index, column)
+    if store.set_value(index, column, raw_value):
+        for key in list(indexes):
+            if key[1] == column:
+                indexes[key] = type(indexes[key])(column).build(store)
+        return
+    new_code = store.code(index, column)
+    for (kind, indexed_column), built in indexes.items():
+        if indexed_column != column:
+            continue
+        if kind is SortedIndex:
+            built.move(index, old_value, store.value(index, column))
+        else:
+            built.move(index, old_code, new_code)
+
+
+def padded(array, length, fill):
+    # Categories interned after a build add codes a moved index may not have grown to
+    return np.concatenate((array, np.full(length - len(array), fill, dtype=array.dtype)))
+
+
+def assert_matches_fresh(store, indexes):
+    for (kind, column), moved in indexes.items():
+        fresh = kind(column).build(store)
+        if kind is IdIndex:
+            length = len(fresh.first_rows)
+            assert padded(moved.first_rows, length, -1).tolist() == fresh.first_rows.tolist()
+            assert padded(moved.counts, length, 0).tolist() == fresh.counts.tolist()
+        elif kind is HashIndex:
+            assert moved.order.tolist() == fresh.order.tolist()
+            assert padded(moved.starts, len(fresh.starts), moved.starts[-1]).tolist() == fresh.starts.tolist()
+        else:
+            assert moved.keys.tolist() == fresh.keys.tolist()
+            assert moved.positions.tolist() == fresh.positions.tolist()
+        if kind is not SortedIndex:
+            keys = {normalize_key(store.value(index, column)) for index in range(len(store))} | {'nan', 'absent'}
+            for key in keys:
+                assert moved.lookup(key).tolist() == fresh.lookup(key).tolist(), (column, key)
+                assert moved.first(key) == fresh.first(key), (column, key)
+
+
+def assert_key_table_matches(store, column):
+    categories = store.category_list(column)
+    for code, value in enumerate(categories):
+        assert store.code_of(column, value) == code
+    assert store.code_of(column, 'never interned') is None
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_moved_indexes_match_fresh_builds(seed):
+    rng = random.Random(seed)
+    store = make_store(seed=seed)
+    indexes = {(IdIndex, 'Inventory_ID'): IdIndex('Inventory_ID').build(store),
+               (HashIndex, 'Inventory_ID'): HashIndex('Inventory_ID').build(store),
+               (HashIndex, 'Name'): HashIndex('Name').build(store),
+               (SortedIndex, 'Price'): SortedIndex('Price').build(store),
+               (SortedIndex, 'Quantity_in_Stock'): SortedIndex('Quantity_in_Stock').build(store)}
+    for step in range(200):
+        index = rng.randrange(len(store))
+        column = rng.choice(['Inventory_ID', 'Name', 'Price', 'Quantity_in_Stock'])
+        if store.is_numeric(column):
+            raw_value = rng.choice(['1', '2', '-4', '2.5', '', '0'])
+        elif column == 'Inventory_ID':
+            # Renames onto existing IDs, their dollar forms and new ones
+            raw_value = rng.choice([str(store.value(rng.randrange(len(store)), column)),
+                                    '$' + str(store.value(rng.randrange(len(store)), column)),
+                                    'IN%04d' % rng.randrange(60)])
+        else:
+            raw_value = rng.choice(VALUES)
+        update(store, indexes, index, column, raw_value)
+        assert_matches_fresh(store, indexes)
+    assert_key_table_matches(store, 'Inventory_ID')
+    assert_key_table_matches(store, 'Name')
+
+
+def test_id_index_returns_first_of_duplicates():
+    store = ColumnStore.from_dataframe(pd.DataFrame({'Inventory_ID': ['IN1', 'IN2', 'IN1', '$IN1', None]}))
+    index = IdIndex('Inventory_ID').build(store)
+    assert index.get('IN1') == 0
+    assert index.lookup('IN1').tolist() == [0, 2, 3]
+    assert index.lookup('nan').tolist() == [4]
+    assert index.first('$IN2') == 1
+    assert index.get('IN3') is None
+    update(store, {(IdIndex, 'Inventory_ID'): index}, 0, 'Inventory_ID', 'IN2')
+    assert index.get('IN1') == 2
+    assert index.get('IN2') == 0
+
+
+def test_key_table_skips_categories_that_are_not_text():
+    categories = ['a', 1, 2.5, True, 'b', '\udcff', 'a ']
+    table = KeyTable.build(categories)
+    for code, value in enumerate(categories):
+        assert table.get(categories, value) == (code if isinstance(value, str) else None)
+    assert table.get(categories, 'c') is None
+    table.add('c', len(categories))
+    assert table.get(categories, 'c') == len(categories)
+
+
+def test_move_into_a_category_interned_after_the_build():
+    store = ColumnStore.from_dataframe(pd.DataFrame({'Name': ['a', 'b', None, 'a']}))
+    indexes = {(HashIndex, 'Name'): HashIndex('Name').build(store), (IdIndex, 'Name'): IdIndex('Name').build(store)}
+    for index, raw_value in [(2, 'new'), (0, 'newer'), (3, 'new'), (1, 'a')]:
+        update(store, indexes, index, 'Name', raw_value)
+        assert_matches_fresh(store, indexes)
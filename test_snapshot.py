@@ -0,0 +1,141 @@
+import numpy as np
+import pandas as pd
+import pytest
+import inventory_pb2
+import snapshot
+from inventory_index import HashIndex, IdIndex, SortedIndex, normalize_key
+from inventory_store import ColumnStore
+from server import InventoryServiceServicer
+
+
+class Context:
+    code = None
+    details = None
+
+    def set_code(self, code):
+        self.code = code
+
+    def set_details(self, details):
+        self.details = details
+
+
+def make_frame():
+    return pd.DataFrame({
+        'Inventory_ID': ['IN0001', 'IN0002', '$IN0001', None, 'IN0005'],
+        'Name': ['Bolt', 'Nut', 'Bolt', '$Nut', 'Café é'],
+        'Mixed': ['text', 7, 2.5, True, None],
+        'Price': [1.5, np.nan, 3.0, -2.25, 0.0],
+        'Quantity_in_Stock': [5, 0, 12, 3, 7],
+        'Empty': [None] * 5,
+    })
+
+
+def assert_same_store(saved, loaded):
+    assert loaded.columns == saved.columns
+    assert len(loaded) == len(saved)
+    for column in saved.columns:
+        assert loaded.is_numeric(column) == saved.is_numeric(column)
+        for index in range(len(saved)):
+            assert repr(loaded.value(index, column)) == repr(saved.value(index, column)), (column, index)
+        if not saved.is_numeric(column):
+            assert [repr(value) for value in loaded.category_list(column)] == \
+                [repr(value) for value in saved.category_list(column)]
+            for code, value in enumerate(saved.category_list(column)):
+                if isinstance(value, str):
+                    assert loaded.code_of(column, value) == code
+
+
+def test_round_trip_keeps_values_categories_and_indexes(tmp_path):
+    store = ColumnStore.from_dataframe(make_frame())
+    # Categories interned since the store's key table was built have to be saved in the table too
+    store.set_value(0, 'Name', 'Washer')
+    indexes = [IdIndex('Inventory_ID').build(store), HashIndex('Name').build(store), SortedIndex('Price').build(store)]
+    path = str(tmp_path / 'inventory.snapshot')
+    snapshot.save(store, path, indexes)
+
+    loaded, saved_indexes = snapshot.load(path)
+    assert_same_store(store, loaded)
+    assert set(saved_indexes) == {('IdIndex', 'Inventory_ID'), ('HashIndex', 'Name'), ('SortedIndex', 'Price')}
+    for index in indexes:
+        arrays = saved_indexes[(type(index).__name__, index.column)]
+        for name, array in index.arrays().items():
+            assert arrays[name].tolist() == array.tolist()
+    assert loaded.code_of('Name', 'Washer') == store.code_of('Name', 'Washer')
+    assert IdIndex('Inventory_ID').load(loaded, saved_indexes[('IdIndex', 'Inventory_ID')]).get('IN0002') == 1
+
+
+def test_loaded_store_takes_updates_without_changing_the_file(tmp_path):
+    store = ColumnStore.from_dataframe(make_frame())
+    path = str(tmp_path / 'inventory.snapshot')
+    snapshot.save(store, path)
+    with open(path, 'rb') as snapshot_file:
+        saved_bytes = snapshot_file.read()
+
+    loaded, _ = snapshot.load(path)
+    loaded.set_value(1, 'Name', 'Spring')
+    loaded.set_value(2, 'Quantity_in_Stock', '2.5')
+    loaded.set_value(3, 'Price', '')
+    assert loaded.value(1, 'Name') == 'Spring'
+    assert loaded.code_of('Name', 'Spring') is not None
+    assert loaded.value(2, 'Quantity_in_Stock') == 2.5
+    assert pd.isna(loaded.value(3, 'Price'))
+    with open(path, 'rb') as snapshot_file:
+        assert snapshot_file.read() == saved_bytes
+
+    # And a snapshot of the updated store holds the updates
+    snapshot.save(loaded, path)
+    assert_same_store(loaded, snapshot.load(path)[0])
+
+
+def test_empty_store_round_trips(tmp_path):
+    store = ColumnStore.from_dataframe(pd.DataFrame({'Inventory_ID': pd.Series([], dtype=object),
+                                                     'Price': pd.Series([], dtype=float)}))
+    path = str(tmp_path / 'inventory.snapshot')
+    snapshot.save(store, path, [IdIndex('Inventory_ID').build(store)])
+    loaded, saved_indexes = snapshot.load(path)
+    assert_same_store(store, loaded)
+    assert IdIndex('Inventory_ID').load(loaded, saved_indexes[('IdIndex', 'Inventory_ID')]).get('IN0001') is None
+
+
+def test_unsupported_categories_and_files_are_rejected(tmp_path):
+    store = ColumnStore.from_dataframe(pd.DataFrame({'Date': [pd.Timestamp('2024-01-01')]}))
+    path = str(tmp_path / 'inventory.snapshot')
+    with pytest.raises(TypeError):
+        snapshot.save(store, path)
+    with open(path, 'wb') as snapshot_file:
+        snapshot_file.write(b'not a snapshot')
+    with pytest.raises(ValueError):
+        snapshot.load(path)
+
+
+def test_servicer_restarts_from_snapshot_and_change_log(tmp_path):
+    workbook = str(tmp_path / 'inventory.xlsx')
+    make_frame().to_excel(workbook, index=False, engine='openpyxl')
+    options = dict(indexed_columns=('Name',), flush_batch_size=10 ** 6, flush_interval=10 ** 6)
+    first = InventoryServiceServicer(workbook, **options)
+    for key_value, val_name, val_val_new in [('IN0002', 'Name', 'Bolt'), ('IN0005', 'Inventory_ID', 'IN0001'),
+                                             ('IN0001', 'Price', '9.75'), ('IN0002', 'NewColumn', 'x')]:
+        context = Context()
+        first.update(inventory_pb2.UpdateRequest(key_name='Inventory_ID', key_value=key_value,
+                                                 val_name=val_name, val_val_new=val_val_new), context)
+        assert context.code is None, context.details
+
+    # Started from the snapshot written when the workbook was first loaded, with the logged updates replayed
+    second = InventoryServiceServicer(workbook, **options)
+    try:
+        assert_same_store(first.inventory_data, second.inventory_data)
+        assert second.id_index.first_rows.tolist() == first.id_index.first_rows.tolist()
+        for key in {normalize_key(value) for value in second.inventory_data.category_list('Name')} | {'nan'}:
+            assert second.secondary_indexes['Name'].lookup(key).tolist() == \
+                first.secondary_indexes['Name'].lookup(key).tolist()
+    finally:
+        second.close()
+        first.close()
+
+    # Closing wrote the updates through to the workbook and a fresh snapshot
+    assert snapshot.is_fresh(workbook + '.snapshot', workbook)
+    third = InventoryServiceServicer(workbook, **options)
+    try:
+        assert_same_store(first.inventory_data, third.inventory_data)
+    finally:
+        third.close()